@@ -1,42 +1,18 @@
 #!/usr/bin/env python
 from enum import Enum
 
-import pygame
-import sys
 import time
-import random
-import numpy as np
-from random import *
-from button import Button
-from pygame.locals import *
-import neat
+from random import Random
+from world import World
+from patterns import ObstacleSchedule
+from envspec import EnvSpec
 import math
 
-pygame.init()
+# nothing here touches pygame, the window, fonts and drawing live in render.py
 
-RED = (255, 0, 0)
-BLUE = (0, 0, 255)
-GREEN = (0, 255, 0)
-BLACK = (0, 0, 0)
-GREY = (50, 50, 50)
-WHITE = (255, 255, 255)
-ORANGE = (255, 180, 0)
-
-BUTTON_STYLE = {"hover_color": GREY,
-                "clicked_color": WHITE,
-                "clicked_font_color": BLACK,
-                "font": pygame.font.SysFont("monospace", 30)}
-
-fpsClock = pygame.time.Clock()
+# the default arena, a game takes its own from its EnvSpec
 
 SCREEN_WIDTH, SCREEN_HEIGHT = 300, 600
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), 0, 32)
-surface = pygame.Surface(screen.get_size())
-surface = surface.convert()
-surface.fill((255, 255, 255))
-clock = pygame.time.Clock()
-
-pygame.key.set_repeat(1, 40)
 
 GRID_SIZE = 1
 GRID_WIDTH = SCREEN_WIDTH / GRID_SIZE
@@ -47,13 +23,15 @@ SCALE_GRAVITY = GRID_HEIGHT * GRAVITY * 0.001
 
 # print("SCALE_GRAVITY = {0}".format(SCALE_GRAVITY))
 
-screen.blit(surface, (0, 0))
-
 OBSTACLE_SPEED = GRID_HEIGHT * 0.01
 OBSTACLE_MIN_WIDTH = GRID_WIDTH / 3.4
 OBSTACLE_MAX_WIDTH = GRID_WIDTH / 2
 
-text_font = pygame.font.SysFont('monospace', 30)
+# what GamePlay.key_down() understands, render.py maps the keyboard to these
+KEY_RESET = 'reset'
+KEY_START = 'start'
+KEY_LEFT = 'left'
+KEY_RIGHT = 'right'
 
 
 class GameState(Enum):
@@ -68,32 +46,24 @@ class PlayerState(Enum):
     DEAD = 2
 
 
-def draw_box(surf, color, pos, dim):
-    r = pygame.Rect((int(pos[0] - dim[0] / 2 + 1), pos[1]), dim)
-    pygame.draw.rect(surf, color, r)
-
-
-def draw_circle(surf, color, pos, radius):
-    pygame.draw.circle(surf, color, pos, radius)
-
-
-def draw_button(surf, color, pos, dim, text):
-    r = pygame.Rect(pos, dim)
-    pygame.draw.rect(surf, color, r)
+PLAYER_STATES = dict((state.value, state) for state in PlayerState)
 
 
 class Component:
+    # no __dict__, a game can have thousands of these. The screen and the arena
+    # size belong to the game, an entity only keeps its row in the world
+    __slots__ = ('id', 'game_play', 'world', 'index')
     ID = 0
 
-    def __init__(self, the_screen, position):
+    def __init__(self, position, game_play):
         Component.ID += 1
         self.id = Component.ID
-        self.screen = the_screen
+        self.game_play = game_play
         self.position = position
-        self.screen_size = self.screen.get_size()
 
-    def draw(self, surf):
-        pass
+    @property
+    def screen_size(self):
+        return self.game_play.spec.screen_size
 
     def is_out(self):
         pass
@@ -103,18 +73,41 @@ class Component:
 
 
 class Obstacle(Component):
-    def __init__(self, the_screen, position, radius, game_play):
-        super().__init__(the_screen, position)
+    __slots__ = ('radius',)
+    color = (0, 0, 0)
+
+    def __init__(self, position, radius, game_play):
+        self.world = game_play.world
+        self.index = self.world.add_obstacle(radius)
+        super().__init__(position, game_play)
         self.radius = radius
-        self.color = (0, 0, 0)
-        self.game_play = game_play
-        self.velocity = (0, OBSTACLE_SPEED)
         self.randomize()
 
+    @property
+    def position(self):
+        positions = self.world.obstacle_positions
+        return int(positions.item(self.index, 0)), int(positions.item(self.index, 1))
+
+    @position.setter
+    def position(self, position):
+        self.world.place_obstacle(self.index, position)
+
+    @property
+    def velocity(self):
+        return tuple(self.world.obstacle_velocities[self.index])
+
+    @velocity.setter
+    def velocity(self, velocity):
+        self.world.set_obstacle_velocity(self.index, velocity)
+
+    def interpolated_position(self, alpha):
+        return self.world.interpolate(self.world.previous_obstacle_positions, self.world.obstacle_positions,
+                                      self.index, alpha)
+
     def randomize(self):
         radius = self.radius
         # int(uniform(radius, GRID_WIDTH - radius))
-        x = int(GRID_WIDTH//4)
+        x = self.game_play.spec.lane_width
         # i = randrange(5)
         i = self.game_play.get_current_obstacle_pattern() - 1
         self.set_position((i * x, self.position[1]))
@@ -122,23 +115,20 @@ class Obstacle(Component):
         # print(self.position, self.radius)
         # print("----------------------------")
 
-    def update(self):
-        self.set_position(np.add(self.position, self.velocity))
-
-        if self.is_out():
-            self.randomize()
-            self.set_position((self.position[0], -self.radius))
+    def respawn(self):
+        self.randomize()
+        self.set_position((self.position[0], -self.radius))
+        # jumps to the top, drawing it in between would sweep it across the screen
+        self.world.previous_obstacle_positions[self.index] = self.world.obstacle_positions[self.index]
 
     #         - self.game_play.obstacle_gap *
     #                                (self.game_play.number_of_obstacles - 2))
 
-    def draw(self, surf):
-        draw_circle(surf, self.color, self.position, self.radius)
-
     def is_out(self):
         return self.position[1] - self.radius > self.screen_size[1]
 
     def touch(self, players):
+        # one obstacle at a time, GamePlay.step() uses the batched World.collide()
         for player in players:
             if player.state == PlayerState.DEAD:
                 continue
@@ -151,20 +141,65 @@ class Obstacle(Component):
 
 
 class Player(Component):
-    def __init__(self, the_screen, position, player_radius, game_play, border_width=0, jump_power=8 * SCALE_GRAVITY):
-        super().__init__(the_screen, position)
+    __slots__ = ('radius', 'color', 'border_width', 'jump_power', 'radius_without_border', 'dead_tick')
+
+    def __init__(self, position, player_radius, game_play, border_width=0, jump_power=None):
+        self.world = game_play.world
+        self.index = game_play.register_player(self, player_radius)
+        super().__init__(position, game_play)
         self.radius = player_radius
-        self.game_play = game_play
-        self.state = PlayerState.ALIVE
         # velocity => (x,y)
-        self.color = pygame.Color(50 + int(150 * random()), 50 + int(150 * random()), 50 + int(150 * random()))
-        self.velocity = (0, 0)
+        colors = game_play.cosmetic_random
+        self.color = (50 + int(150 * colors.random()), 50 + int(150 * colors.random()),
+                      50 + int(150 * colors.random()))
         self.border_width = border_width
+        if jump_power is None:
+            jump_power = 8 * game_play.spec.scale_gravity
         self.jump_power = jump_power
         self.radius_without_border = self.radius - border_width
-        self.dead_score = 0
-        self.last_jump = -7
-        self.dead_time = 0
+        # the tick it died on, the renderer fades it out some ticks later
+        self.dead_tick = 0
+
+    # the player's state lives in its row of game_play.world
+    @property
+    def position(self):
+        positions = self.world.positions
+        return int(positions.item(self.index, 0)), int(positions.item(self.index, 1))
+
+    @position.setter
+    def position(self, position):
+        self.world.positions[self.index] = position
+
+    @property
+    def velocity(self):
+        return tuple(self.world.velocities[self.index])
+
+    @velocity.setter
+    def velocity(self, velocity):
+        self.world.velocities[self.index] = velocity
+
+    @property
+    def state(self):
+        return PLAYER_STATES[self.world.states.item(self.index)]
+
+    @state.setter
+    def state(self, state):
+        self.world.states[self.index] = state.value
+
+    @property
+    def last_jump(self):
+        return self.world.last_jumps.item(self.index)
+
+    @last_jump.setter
+    def last_jump(self, last_jump):
+        self.world.last_jumps[self.index] = last_jump
+
+    def interpolated_position(self, alpha):
+        return self.world.interpolate(self.world.previous_positions, self.world.positions, self.index, alpha)
+
+    @property
+    def dead_score(self):
+        return self.world.dead_scores.item(self.index)
 
     def jump(self, is_right=False):
         if self.game_play.current_fps - self.last_jump < 7:
@@ -173,7 +208,7 @@ class Player(Component):
         if self.state == PlayerState.DEAD:
             return
         # print("Player id {0} jump".format(self.id))
-        x_speed = -0.025 * GRID_WIDTH
+        x_speed = -0.025 * self.game_play.grid_width
         if is_right:
             x_speed *= -1
         self.velocity = (x_speed, -self.jump_power)
@@ -187,59 +222,20 @@ class Player(Component):
         return self.position[0] + self.radius > self.screen_size[0] \
                or self.position[0] - self.radius < 0
 
-    def update_position(self):
-        self.set_position(np.add(self.position, self.velocity))
-
-    def update(self):
-        if self.game_play.state in [GameState.ALL_DEAD, GameState.WAITING]:
-            return
-        if self.state == PlayerState.DEAD:
-            self.velocity = (0, OBSTACLE_SPEED)
-            self.update_position()
-            return
-        self.velocity = np.add(self.velocity, (0, SCALE_GRAVITY))
-        self.update_position()
-
-        if self.is_out():
-            # self.set_position((self.position[0], GRID_HEIGHT - self.radius))
-            self.dead()
-            # print("DEAD")
-            return
-
-        if self.touch_boundary():
-            if self.position[0] - self.radius < 0:
-                self.set_position((0 + self.radius, self.position[1]))
-            else:
-                self.set_position((GRID_WIDTH - self.radius, self.position[1]))
-            self.velocity[0] *= -1
-
     def dead(self):
         if self.state == PlayerState.DEAD:
             return
-        self.state = PlayerState.DEAD
-        # Add player to the list of dead players
-        self.game_play.dead(self)
-        self.dead_score = self.game_play.get_score()
-        self.dead_time = time.time()
+        self.game_play.kill([self.index])
 
     def start(self):
         self.state = PlayerState.ALIVE
 
-    def draw(self, surf):
-        self.update()
-        draw_circle(surf, BLACK, self.position, self.radius)
-        draw_circle(surf, self.color, self.position, self.radius_without_border)
-
-        # pygame.draw.line(surf, BLUE, (int(x + radius), 0), (int(x + radius), GRID_HEIGHT), 1)
-        # pygame.draw.line(surf, BLUE, (int(x - radius), 0), (int(x - radius), GRID_HEIGHT), 1)
-        #
-        # pygame.draw.line(surf, BLUE, (0, int(y + radius)), (GRID_WIDTH, int(y + radius)), 1)
-        # pygame.draw.line(surf, BLUE, (0, int(y - radius)), (GRID_WIDTH, int(y - radius)), 1)
-
 
 class AI(Player):
-    def __init__(self, screen, position, player_radius, game_play):
-        super().__init__(screen, position, player_radius, game_play)
+    __slots__ = ()
+
+    def __init__(self, position, player_radius, game_play):
+        super().__init__(position, player_radius, game_play)
 
     # def update(self):
     #     super().update()
@@ -249,107 +245,161 @@ class AI(Player):
     #         self.jump(random() >= 0.5)
 
 
+class SimulationClock(object):
+    """
+    Fixed timestep for playing in real time: the game only ever advances in whole
+    ticks of 1 / tick_rate seconds, however many frames are drawn in between.
+
+    advance() returns how many ticks are due since it was last called, ``alpha``
+    how far the wall clock is into the next one. After a stall at most
+    ``max_ticks`` are played at once, the game slows down instead of freezing
+    while it catches up.
+    """
+
+    def __init__(self, tick_rate, max_ticks=5):
+        self.tick_rate = tick_rate
+        self.max_ticks = max_ticks
+        self.last = None
+        self.accumulator = 0.0
+
+    def advance(self):
+        now = time.perf_counter()
+        if self.last is not None:
+            self.accumulator += now - self.last
+        self.last = now
+        ticks = int(self.accumulator * self.tick_rate)
+        self.accumulator -= ticks / self.tick_rate
+        if ticks > self.max_ticks:
+            ticks = self.max_ticks
+        return ticks
+
+    @property
+    def alpha(self):
+        return min(1.0, self.accumulator * self.tick_rate)
+
+
 class GamePlay(object):
-    def __init__(self, fps, gen=None, draw_line=False, the_pattern=None):
+    def __init__(self, fps, gen=None, draw_line=False, the_pattern=None, headless=False, schedule=None, seed=None,
+                 spec=None, profiler=None):
+        # the arena, physics and obstacle patterns, the default game when None
+        if spec is None:
+            spec = EnvSpec()
+        self.spec = spec
         self.current_fps = 0
         self.FPS = fps
         self.state = GameState.MENU
         self.gen = gen
+        # headless => run physics and collisions only, nothing is drawn
+        self.headless = headless
+        # a profiling.Profiler times physics, collisions and rendering, None => nothing is timed
+        self.profiler = profiler
+        self.renderers = []
 
         self.score = 0
-        self.start_time = 0
+        # everything is counted in ticks, never in wall-clock time, so the game
+        # plays the same at any speed
+        self.start_tick = 0
 
         self.players = []
         self.dead_players = []
         self.main_player = None
-
-        self.screen = screen
-        self.fpsClock = fpsClock
-        self.surface = surface
-        self.screen_rect = self.screen.get_rect()
+        self.player_slots = []
+        self.world = self.new_world()
 
         self.count = 0
-        self.play_button = Button((0, 0, 200, 50), BLACK, self.play_button_click,
-                                  text="Play", **BUTTON_STYLE)
-        self.play_button.rect.center = (self.screen_rect.centerx, 100)
 
-        self.y_scale = int(GRID_HEIGHT // 4)
-        self.x_scale = int(GRID_WIDTH // 4)
+        self.y_scale = int(spec.grid_height // 4)
+        self.x_scale = int(spec.grid_width // 4)
         self.starting_y = 3 * self.y_scale
-        self.player_radius = int(GRID_WIDTH // 12)
+        self.player_radius = spec.player_radius
 
         self.obstacles = []
-        self.number_of_obstacles = 3
-        self.obstacle_gap = GRID_HEIGHT // self.number_of_obstacles
-        self.obstacle_radius = int(GRID_WIDTH // 12)
+        self.number_of_obstacles = spec.number_of_obstacles
+        self.obstacle_gap = spec.grid_height // self.number_of_obstacles
+        self.obstacle_radius = spec.obstacle_radius
 
         self.player_init_position = (2 * self.x_scale, self.starting_y)
         self.draw_line = draw_line
 
-        self.grid_width = GRID_WIDTH
-        self.grid_height = GRID_HEIGHT
-
-        self.obstacle_patterns = [
-            # [1, 2, 3, 4, 5], # pattern a
-            # [5, 4, 3, 2, 1], # pattern b
-            # [2, 4, 2, 4, 3], # pattern c
-            # [1, 5, 2, 4, 3], # pattern d
-        ]
-
-        if the_pattern is None or the_pattern == 'a':
-            self.obstacle_patterns.append([1, 2, 3, 4, 5])
-        elif the_pattern == 'b':
-            self.obstacle_patterns.append([5, 4, 3, 2, 1])
-        elif the_pattern == 'c':
-            self.obstacle_patterns.append([2, 4, 2, 4, 3])
+        self.grid_width = spec.grid_width
+        self.grid_height = spec.grid_height
 
+        # obstacles come from a seeded schedule, colors from their own stream so that
+        # the number of players never changes the obstacles
+        if schedule is None:
+            schedule = ObstacleSchedule.for_pattern(the_pattern, seed, spec)
+        self.schedule = schedule
+        self.obstacle_patterns = schedule.patterns
         self.total_patterns = len(self.obstacle_patterns)
+        self.lanes = schedule.stream()
+        self.cosmetic_random = Random()
 
-        self.current_patterns = []
+        # the window is only opened when something is drawn
+        if not self.headless:
+            from render import GameRenderer
+            self.attach_renderer(GameRenderer(spec.screen_size))
 
     def get_score(self):
         return self.score
 
     def set_up(self):
         self.score = 0
-        y_scale = int(GRID_HEIGHT // 4)
-        x_scale = int(GRID_WIDTH // 4)
+        y_scale = int(self.grid_height // 4)
+        x_scale = int(self.grid_width // 4)
         #
         self.players = []
         self.dead_players = []
-        # ai = AI(self.screen, self.player_init_position, self.player_radius, self)
+        self.player_slots = []
+        self.world = self.new_world()
+        # ai = AI(self.player_init_position, self.player_radius, self)
         # self.players.append(ai)
-        # ai = AI(self.screen, self.player_init_position, self.player_radius, self)
+        # ai = AI(self.player_init_position, self.player_radius, self)
         # self.players.append(ai)
         # self.add_main_player()
 
         # obstacles
         self.obstacles = []
-        obstacle_height = int(GRID_HEIGHT // 100)
+        obstacle_height = int(self.grid_height // 100)
         for i in range(self.number_of_obstacles):
-            obstacle = Obstacle(self.screen, (2 * x_scale, -self.obstacle_radius -i * self.obstacle_gap),
+            obstacle = Obstacle((2 * x_scale, -self.obstacle_radius -i * self.obstacle_gap),
                                 self.obstacle_radius, self)
             self.obstacles.append(obstacle)
 
+    def new_world(self):
+        spec = self.spec
+        return World(spec.grid_width, spec.grid_height, spec.scale_gravity, spec.obstacle_step)
+
+    def register_player(self, player, radius):
+        """ Give a new player its row in the world, returns the row index. """
+        self.player_slots.append(player)
+        return self.world.add_player(radius)
+
     def get_current_obstacle_pattern(self):
-        if len(self.current_patterns) == 0:
-            pos = randrange(self.total_patterns)
-            self.current_patterns += self.obstacle_patterns[pos]
-            # here
-        result = self.current_patterns[0]
-        self.current_patterns = self.current_patterns[1:]
-        return result
+        return next(self.lanes)
+
+    def upcoming_lanes(self, count):
+        """ The lanes of the next ``count`` obstacle respawns. """
+        return self.lanes.peek(count)
 
     def add_player(self, player):
         self.players.append(player)
 
     def add_main_player(self):
-        self.main_player = Player(self.screen, self.player_init_position, self.player_radius, self, 2)
+        self.main_player = Player(self.player_init_position, self.player_radius, self, 2)
         self.add_player(self.main_player)
 
     def dead(self, player):
         self.dead_players.append(player)
 
+    def kill(self, indices):
+        """ Kill the players at the given world rows with the current score. """
+        self.world.kill(indices, self.get_score())
+        for index in indices:
+            player = self.player_slots[index]
+            # Add player to the list of dead players
+            self.dead(player)
+            player.dead_tick = self.current_fps
+
     def prepare(self):
         self.set_up()
         self.state = GameState.WAITING
@@ -359,110 +409,109 @@ class GamePlay(object):
         self.add_main_player()
 
     def start(self):
-        self.start_time = time.time()
+        self.start_tick = self.current_fps
         self.state = GameState.PLAYING
         for player in self.players:
             player.start()
 
-    def draw_menu(self, surf):
-        self.play_button.update(surf)
-
     def check_event(self, event):
-        self.play_button.check_event(event)
-        if event.type == KEYDOWN:
-            self.key_down(event.key)
+        """ Pass a pygame event to the renderers, they turn it into key_down() calls. """
+        for renderer in self.renderers:
+            renderer.check_event(self, event)
 
     def key_down(self, key):
         self.count += 1
-        if key in [K_o]:
+        if key == KEY_RESET:
             if self.state not in [GameState.MENU, GameState.ALL_DEAD]:
                 return
             self.prepare()
-        if key in [K_p]:
+        if key == KEY_START:
             if self.state != GameState.WAITING:
                 return
             self.start()
-        if key in [K_RIGHT, K_LEFT]:
+        if key in [KEY_RIGHT, KEY_LEFT]:
             if self.state == GameState.WAITING:
                 self.start()
             if self.state != GameState.PLAYING:
                 return
-            self.main_player.jump(key == K_RIGHT)
+            self.main_player.jump(key == KEY_RIGHT)
 
-    def draw(self):
+    def step(self):
+        """Advance the game by one tick without drawing anything."""
         self.current_fps += 1
-
-        self.surface.fill((255, 255, 255))
-
-        for x in range(0, int(GRID_WIDTH), 25):
-            pygame.draw.line(self.surface, (200, 200, 200), (x, 0), (x, int(GRID_HEIGHT)), 1)
-        for y in range(0, int(GRID_HEIGHT), 25):
-            pygame.draw.line(self.surface, (200, 200, 200), (0, y), (int(GRID_WIDTH), y), 1)
-
-        t = time.time()
+        if not self.headless:
+            self.world.save_previous()
 
         if self.state in [GameState.PLAYING, GameState.WAITING, GameState.ALL_DEAD]:
             if len(self.players) == len(self.dead_players):
                 self.state = GameState.ALL_DEAD
             if self.state == GameState.PLAYING:
-                self.score = self.current_fps / 7
-            for player in self.players:
-                if player.state == PlayerState.DEAD and t - player.dead_time > 1:
-                    continue
-                if self.draw_line:
-                    obstacles = self.closest_obstacles(player)
-                    for obstacle in obstacles:
-                        if obstacle[1] > 1000:
-                            continue
-                        pygame.draw.line(self.surface, RED, player.position, obstacle[0], 1)
-                player.draw(self.surface)
-            for obstacle in self.obstacles:
-                if self.state == GameState.PLAYING:
-                    obstacle.update()
-                    obstacle.touch(self.players)
-                obstacle.draw(self.surface)
-
-        if self.state in [GameState.MENU
-                          # ,GameState.ALL_DEAD
-                          ]:
-            self.draw_menu(self.surface)
-
-        self.screen.blit(self.surface, (0, 0))
-
-        for player in self.dead_players:
-            if player.state == PlayerState.DEAD and t - player.dead_time > 1:
-                continue
-            text_surface = text_font.render("{:.1f}".format(player.dead_score), True, (255, 255, 255), (0, 25, 0))
-            self.screen.blit(text_surface, (player.position[0] - player.radius, player.position[1] - 2.5 * player.radius))
-
-        text_surface = text_font.render("{:.1f}" .format(self.score), True, (255, 255, 255), (0, 0, 0))
-        score_y = 0
-        if self.gen is not None:
-            score_y = 35
-        self.screen.blit(text_surface, (0, score_y))
+                self.score = (self.current_fps - self.start_tick) / 7
+            if self.state == GameState.PLAYING:
+                if self.profiler is None:
+                    self.move()
+                    self.collide()
+                else:
+                    t = self.profiler.time()
+                    self.move()
+                    t = self.profiler.record('physics', t)
+                    self.collide()
+                    self.profiler.record('collision', t)
+
+    def move(self):
+        """ Physics of a tick: players fall and bounce, obstacles fall and respawn. """
+        self.kill(self.world.update_players())
+        for index in self.world.update_obstacles():
+            self.obstacles[index].respawn()
+
+    def collide(self):
+        self.kill(self.world.collide())
+
+    def attach_renderer(self, renderer):
+        self.renderers.append(renderer)
+
+    def detach_renderer(self, renderer):
+        self.renderers.remove(renderer)
+
+    def ticks(self, seconds):
+        """ How many ticks ``seconds`` of game time are at the game's FPS. """
+        return int(seconds * self.FPS)
+
+    def render(self, alpha=1.0):
+        """
+        Let every attached renderer paint the current state. Returns the rects of
+        the window that changed, for pygame.display.update().
+
+        ``alpha`` is how far the frame is between the last tick and the next one,
+        the renderers draw things that far along the way they moved in that tick.
+        """
+        if self.profiler is not None:
+            t = self.profiler.time()
+        dirty = []
+        for renderer in self.renderers:
+            dirty.extend(renderer.render(self, alpha))
+        if self.profiler is not None:
+            self.profiler.record('render', t)
+        return dirty
 
-        if self.gen is not None:
-            text_surface = text_font.render("Gen: {0}".format(self.gen), True, (255, 255, 255), (0, 0, 0))
-            self.screen.blit(text_surface, (0, 0))
+    def draw(self):
+        self.step()
+        return self.render()
 
     def closest_obstacles(self, player):
-        obstacle_list = []
-        max_dist = 99999
-        max_position = (GRID_WIDTH, -99999)
-        radius = self.obstacle_radius
-        for obstacle in self.obstacles:
-            position = obstacle.position
-            if position[1] - radius < GRID_HEIGHT or position[1] + radius > 0:
-                d = obstacle.distance(player)
-                obstacle_list.append((obstacle.position, d))
-            else:
-                obstacle_list.append((max_position, 99999))
-        o_len = 3
-        for i in range(0, len(obstacle_list) - o_len):
-            obstacle_list.append((max_position, 99999))
-        obstacle_list.sort(key=lambda tup: tup[1])
-        return obstacle_list[0:o_len]
+        """ (position, distance) of the 3 obstacles closest to ``player``, nearest first. """
+        nearest, offsets = self.world.nearest_obstacles(self.world.positions[[player.index]], 3)
+        return [(self.obstacles[index].position, math.sqrt(dx * dx + dy * dy))
+                for index, (dx, dy) in zip(nearest[0].tolist(), offsets[0].tolist())]
+
+    @property
+    def screen(self):
+        """ The window, None when nothing is drawn. """
+        for renderer in self.renderers:
+            return renderer.screen
+        return None
 
     @property
     def get_fps_clock(self):
-        return self.fpsClock
+        from render import get_display
+        return get_display().clock
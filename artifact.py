@@ -0,0 +1,125 @@
+"""
+A trained network compiled to flat arrays in an ``.npz`` file.
+
+Loading one needs numpy only: no neat, no config file and no pickle. Inference
+runs the nodes in the order FeedForwardNetwork evaluates them with the same
+math, so the outputs are exactly the ones of the genome it was exported from.
+"""
+import math
+
+import numpy as np
+
+
+def tanh_activation(z):
+    z = max(-60.0, min(60.0, 2.5 * z))
+    return math.tanh(z)
+
+
+def sigmoid_activation(z):
+    z = max(-60.0, min(60.0, 5.0 * z))
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+def relu_activation(z):
+    return z if z > 0.0 else 0.0
+
+
+def identity_activation(z):
+    return z
+
+
+# same math as the neat activation functions of the same name
+ACTIVATIONS = {
+    'tanh': tanh_activation,
+    'sigmoid': sigmoid_activation,
+    'relu': relu_activation,
+    'identity': identity_activation,
+}
+
+
+def compile_network(genome, config):
+    """
+    ``genome`` as the nodes FeedForwardNetwork evaluates, in its order. Returns the
+    number of inputs, the nodes as (activation name, bias, response, links) with
+    the links as (value column, weight) pairs, and the value column of every output.
+
+    The value columns are the inputs, then one per node in order, then a last one
+    that is always 0.0 and stands for outputs no node computes. Both the .npz
+    export and the batched inference.PopulationNetwork are built from this.
+    """
+    from neat.nn import FeedForwardNetwork
+
+    genome_config = config.genome_config
+    activation_names = dict((f, name) for name, f in genome_config.activation_defs.functions.items())
+    aggregation_names = dict((f, name) for name, f in genome_config.aggregation_function_defs.functions.items())
+    net = FeedForwardNetwork.create(genome, config)
+
+    columns = dict((key, i) for i, key in enumerate(net.input_nodes))
+    nodes = []
+    for node, act_func, agg_func, bias, response, links in net.node_evals:
+        if aggregation_names.get(agg_func) != 'sum':
+            raise ValueError("Cannot compile aggregation {0!r}".format(aggregation_names.get(agg_func)))
+        activation = activation_names.get(act_func)
+        if activation not in ACTIVATIONS:
+            raise ValueError("Cannot compile activation {0!r}".format(activation))
+        nodes.append((activation, bias, response, [(columns[i], w) for i, w in links]))
+        columns[node] = len(columns)
+    zero = len(columns)
+    return len(net.input_nodes), nodes, [columns.get(key, zero) for key in net.output_nodes]
+
+
+def export_winner(genome, config, filename):
+    """ Compile ``genome`` and write it to ``filename``. """
+    num_inputs, nodes, outputs = compile_network(genome, config)
+    names = sorted(ACTIVATIONS)
+    links = [link for activation, bias, response, node_links in nodes for link in node_links]
+
+    with open(filename, 'wb') as f:
+        np.savez(f,
+                 activation_names=np.array(names),
+                 num_inputs=np.array(num_inputs),
+                 biases=np.array([bias for activation, bias, response, node_links in nodes], dtype=np.float64),
+                 responses=np.array([response for activation, bias, response, node_links in nodes],
+                                    dtype=np.float64),
+                 activations=np.array([names.index(activation) for activation, bias, response, node_links in nodes],
+                                      dtype=np.uint8),
+                 link_offsets=np.cumsum([0] + [len(node_links) for activation, bias, response, node_links in nodes],
+                                        dtype=np.int64),
+                 link_sources=np.array([source for source, weight in links], dtype=np.int64),
+                 link_weights=np.array([weight for source, weight in links], dtype=np.float64),
+                 outputs=np.array(outputs, dtype=np.int64))
+
+
+def load_winner(filename):
+    with np.load(filename) as data:
+        return CompiledNetwork(data)
+
+
+class CompiledNetwork(object):
+    """ Drop-in for FeedForwardNetwork: activate(inputs) returns the list of outputs. """
+
+    def __init__(self, data):
+        names = [str(name) for name in data['activation_names']]
+        self.num_inputs = int(data['num_inputs'])
+        link_offsets = data['link_offsets'].tolist()
+        link_sources = data['link_sources'].tolist()
+        link_weights = data['link_weights'].tolist()
+        # plain Python floats, the evaluation below mirrors FeedForwardNetwork.activate
+        self.nodes = []
+        for i, (bias, response, activation) in enumerate(zip(data['biases'].tolist(), data['responses'].tolist(),
+                                                               data['activations'].tolist())):
+            links = list(zip(link_sources[link_offsets[i]:link_offsets[i + 1]],
+                             link_weights[link_offsets[i]:link_offsets[i + 1]]))
+            self.nodes.append((ACTIVATIONS[names[activation]], bias, response, links))
+        self.outputs = data['outputs'].tolist()
+
+    def activate(self, inputs):
+        if len(inputs) != self.num_inputs:
+            raise RuntimeError("Expected {0:n} inputs, got {1:n}".format(self.num_inputs, len(inputs)))
+
+        values = list(inputs)
+        for act_func, bias, response, links in self.nodes:
+            s = sum([values[i] * w for i, w in links])
+            values.append(act_func(bias + response * s))
+        values.append(0.0)
+        return [values[i] for i in self.outputs]
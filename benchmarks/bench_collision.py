@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""
+Compares the per-obstacle touch() loop the game used to run, over players
+holding their positions as plain tuples, with the broadcasted World.collide()
+for growing populations.
+
+    python benchmarks/bench_collision.py
+"""
+import math
+import os
+import sys
+import time
+import random
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from GameComponent import GamePlay, AI, PlayerState, GRID_WIDTH, GRID_HEIGHT
+
+POPULATIONS = [50, 100, 500, 1000, 5000, 10000]
+REPEAT = 20
+
+
+def make_game(population, seed=0):
+    rnd = random.Random(seed)
+    game_play = GamePlay(150, headless=True)
+    game_play.prepare()
+    for i in range(population):
+        ai = AI(game_play.player_init_position, game_play.player_radius, game_play)
+        game_play.add_player(ai)
+    game_play.start()
+
+    # scatter everything so that some players overlap an obstacle
+    for obstacle in game_play.obstacles:
+        obstacle.set_position((rnd.randrange(int(GRID_WIDTH)), rnd.randrange(int(GRID_HEIGHT))))
+    for player in game_play.players:
+        player.set_position((rnd.randrange(int(GRID_WIDTH)), rnd.randrange(int(GRID_HEIGHT))))
+    return game_play
+
+
+def revive(game):
+    if isinstance(game, LoopGame):
+        game.revive()
+        return
+    game.world.states[:game.world.player_count] = PlayerState.ALIVE.value
+    game.dead_players = []
+
+
+class LoopPlayer(object):
+    """ A player as it was before the World: a tuple position, a radius and a state. """
+
+    def __init__(self, index, position, radius, dead_players):
+        self.index = index
+        self.position = position
+        self.radius = radius
+        self.state = PlayerState.ALIVE
+        self.dead_players = dead_players
+
+    def dead(self):
+        self.state = PlayerState.DEAD
+        self.dead_players.append(self)
+
+
+class LoopObstacle(object):
+    """ The original Obstacle.touch() and distance(), unchanged. """
+
+    def __init__(self, position, radius):
+        self.position = position
+        self.radius = radius
+
+    def touch(self, players):
+        for player in players:
+            if player.state == PlayerState.DEAD:
+                continue
+            a = self.distance(player) < player.radius + self.radius - 0.1
+            if a:
+                player.dead()
+
+    def distance(self, player):
+        return math.sqrt((self.position[0] - player.position[0]) ** 2 + (self.position[1] - player.position[1]) ** 2)
+
+
+class LoopGame(object):
+    """ A copy of the game's positions in the objects the loop used to run over. """
+
+    def __init__(self, game_play):
+        self.dead_players = []
+        self.players = [LoopPlayer(player.index, tuple(player.position), player.radius, self.dead_players)
+                        for player in game_play.players]
+        self.obstacles = [LoopObstacle(tuple(obstacle.position), obstacle.radius) for obstacle in game_play.obstacles]
+
+    def revive(self):
+        for player in self.players:
+            player.state = PlayerState.ALIVE
+        del self.dead_players[:]
+
+
+def loop_collide(game):
+    for obstacle in game.obstacles:
+        obstacle.touch(game.players)
+
+
+def batched_collide(game_play):
+    game_play.kill(game_play.world.collide())
+
+
+def measure(game, collide):
+    best = None
+    dead = None
+    for i in range(REPEAT):
+        revive(game)
+        start = time.perf_counter()
+        collide(game)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+        dead = sorted(player.index for player in game.dead_players)
+    return best, dead
+
+
+if __name__ == '__main__':
+    print('{:>10} {:>8} {:>12} {:>12} {:>9}'.format('players', 'dead', 'loop ms', 'batched ms', 'speedup'))
+    for population in POPULATIONS:
+        game_play = make_game(population)
+        loop_time, loop_dead = measure(LoopGame(game_play), loop_collide)
+        batched_time, batched_dead = measure(game_play, batched_collide)
+        if loop_dead != batched_dead:
+            raise RuntimeError("Collision results differ for {0} players".format(population))
+        print('{:>10} {:>8} {:>12.3f} {:>12.3f} {:>8.1f}x'.format(population, len(loop_dead), loop_time * 1000,
+                                                                 batched_time * 1000, loop_time / batched_time))
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+"""
+Simulation throughput: ticks and genomes per second, and where the time of a tick
+goes, for growing populations and obstacle counts, headless and rendered.
+
+    python benchmarks/bench_throughput.py [--quick] [--output results.json]
+                                          [--compare old.json] [--env arena.txt]
+
+Every configuration plays games of freshly created genomes with
+evaluation.evaluate_genomes(), timed phase by phase by a profiling.Profiler,
+until at least MIN_TICKS ticks were played, the fastest of REPEAT runs counts.
+The results are written as JSON; --compare prints how much slower or faster
+every configuration got against an older results file.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import random
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import neat
+
+from envspec import EnvSpec
+from GameComponent import GamePlay
+from evaluation import evaluate_genomes
+from profiling import Profiler
+
+POPULATIONS = [1, 10, 100, 1000, 10000]
+OBSTACLES = [3, 10, 30, 100]
+# drawing 10k players a frame says nothing new about the renderer
+RENDER_MAX_POPULATION = 1000
+MIN_TICKS = 500
+# the fastest of this many runs counts, the others were disturbed by something else
+REPEAT = 3
+MAX_SCORE = 300
+
+PHASES = ['physics', 'collision', 'sensors', 'network', 'bookkeeping', 'rendering']
+
+
+def load_config(population):
+    config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                         neat.DefaultStagnation, os.path.join(ROOT, 'config-feedforward.txt'))
+    config.pop_size = population
+    return config
+
+
+def make_genomes(config, population, seed=0):
+    random.seed(seed)
+    genomes = []
+    for key in range(population):
+        genome = config.genome_type(key)
+        genome.configure_new(config.genome_config)
+        genomes.append((key, genome))
+    return genomes
+
+
+def play(genomes, config, spec, rendered, seed, profiler):
+    """ One game of ``genomes``, the profiler collects its phases. Returns its ticks. """
+    import pygame
+
+    game_play = GamePlay(0, headless=not rendered, the_pattern='a', seed=seed, spec=spec, profiler=profiler)
+    frame = None
+    if rendered:
+        frame = lambda game_play: pygame.display.update(game_play.render())
+    evaluate_genomes(genomes, config, game_play, MAX_SCORE, frame)
+    return game_play.current_fps
+
+
+def phase_times(profiler):
+    """ Seconds spent in each of PHASES, everything of a tick that is not timed on its own is bookkeeping. """
+    totals = dict((name, sum(samples)) for name, samples in profiler.samples.items())
+    times = dict((phase, totals.get(phase, 0.0)) for phase in ['physics', 'collision', 'sensors', 'network'])
+    times['bookkeeping'] = totals.get('tick', 0.0) - sum(times.values())
+    times['rendering'] = totals.get('frame', 0.0)
+    return times
+
+
+def measure(population, obstacles, rendered, env_file=None):
+    config = load_config(population)
+    genomes = make_genomes(config, population)
+    arena = EnvSpec() if env_file is None else EnvSpec.load(env_file)
+    options = dict((name, getattr(arena, name)) for name, kind in EnvSpec.OPTIONS)
+    options['number_of_obstacles'] = obstacles
+    spec = EnvSpec(patterns=arena.patterns, **options)
+
+    best = None
+    for i in range(REPEAT):
+        profiler = Profiler()
+        games = 0
+        ticks = 0
+        start = time.perf_counter()
+        while ticks < MIN_TICKS:
+            ticks += play(genomes, config, spec, rendered, games, profiler)
+            games += 1
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best[0]:
+            best = (seconds, phase_times(profiler), games, ticks)
+    seconds, timings, games, ticks = best
+
+    return {
+        'mode': 'rendered' if rendered else 'headless',
+        'population': population,
+        'obstacles': obstacles,
+        'games': games,
+        'ticks': ticks,
+        'seconds': seconds,
+        # ticks only, genomes include building their networks and the game
+        'ticks_per_second': ticks / sum(timings.values()),
+        'genomes_per_second': games * population / seconds,
+        # milliseconds per tick, setup is building the networks and the game
+        'phases': dict([(phase, timings[phase] / ticks * 1000) for phase in PHASES] +
+                       [('setup', (seconds - sum(timings.values())) / ticks * 1000)]),
+    }
+
+
+def configurations(quick):
+    populations = [1, 100, 1000] if quick else POPULATIONS
+    obstacles = [3, 30] if quick else OBSTACLES
+    for rendered in [False, True]:
+        for population in populations:
+            if rendered and population > RENDER_MAX_POPULATION:
+                continue
+            for count in obstacles:
+                yield population, count, rendered
+
+
+def compare(results, filename):
+    with open(filename) as f:
+        old = dict(((r['mode'], r['population'], r['obstacles']), r) for r in json.load(f)['results'])
+    print('\n{:>9} {:>10} {:>9} {:>12} {:>12} {:>8}'.format('mode', 'players', 'obstacles', 'old ticks/s',
+                                                           'new ticks/s', 'change'))
+    for result in results:
+        before = old.get((result['mode'], result['population'], result['obstacles']))
+        if before is None:
+            continue
+        change = result['ticks_per_second'] / before['ticks_per_second'] - 1
+        print('{:>9} {:>10} {:>9} {:>12.0f} {:>12.0f} {:>+7.1%}'.format(
+            result['mode'], result['population'], result['obstacles'], before['ticks_per_second'],
+            result['ticks_per_second'], change))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help='a smaller matrix, for a quick look')
+    parser.add_argument('--output', default='bench_throughput.json', help='where the JSON results go')
+    parser.add_argument('--compare', help='an older results file to compare with')
+    parser.add_argument('--env', help='an arena file like config-environment.txt, obstacle counts still vary')
+    args = parser.parse_args()
+
+    print('{:>9} {:>7} {:>9} {:>7} {:>10} {:>11}  {}'.format('mode', 'players', 'obstacles', 'ticks', 'ticks/s',
+                                                            'genomes/s', 'ms per tick: ' + ' '.join(PHASES)))
+    results = []
+    for population, count, rendered in configurations(args.quick):
+        result = measure(population, count, rendered, args.env)
+        results.append(result)
+        print('{:>9} {:>7} {:>9} {:>7} {:>10.0f} {:>11.0f}  {}'.format(
+            result['mode'], population, count, result['ticks'], result['ticks_per_second'],
+            result['genomes_per_second'], ' '.join('{:.3f}'.format(result['phases'][phase]) for phase in PHASES)))
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'min_ticks': MIN_TICKS,
+            'max_score': MAX_SCORE,
+            'env': args.env,
+            'results': results,
+        }, f, indent=2, sort_keys=True)
+    print('Results written to {0}'.format(args.output))
+
+    if args.compare:
+        compare(results, args.compare)
@@ -17,7 +17,7 @@ class Button(object):
     def process_kwargs(self,kwargs):
         """Various optional customization you can change by passing kwargs."""
         settings = {"text" : None,
-                    "font" : pg.font.Font(None,16),
+                    "font" : None,
                     "call_on_release" : True,
                     "hover_color" : None,
                     "clicked_color" : None,
@@ -32,6 +32,8 @@ class Button(object):
             else:
                 raise AttributeError("Button has no keyword: {}".format(kwarg))
         self.__dict__.update(settings)
+        if self.font is None:
+            self.font = pg.font.Font(None,16)
 
     def render_text(self):
         """Pre render the button text."""
@@ -0,0 +1,187 @@
+"""An index of the checkpoints of a run, to pick one and load parts of it without restoring everything."""
+import gzip
+import json
+import os
+import pickle
+import re
+
+import numpy as np
+
+from checkpoint import BinaryCheckPointer, read_header, read_section, unpack_genomes
+from utils import CheckPointer, write_atomic
+
+CATALOG_FILE = 'checkpoints.json'
+
+
+def best_of(keys, fitnesses):
+    """ (key, fitness) of the fittest genome, fitness None stands for not evaluated. """
+    best = (None, None)
+    for key, fitness in zip(keys, fitnesses):
+        if fitness is not None and (best[1] is None or fitness > best[1]):
+            best = (key, fitness)
+    return best
+
+
+class CheckpointCatalog(object):
+    """
+    Generation, best fitness and species of every checkpoint in ``directory``, kept
+    in a small JSON file next to them.
+
+    Packed checkpoints are indexed from their population section and the byte
+    offsets of their genome tables, so one genome or one species can be loaded by
+    decompressing a few kilobytes. Old pickled checkpoints have to be unpickled in
+    full, once to index them and again to load anything from them.
+
+    The catalog is refreshed when it is opened: new or changed files are indexed,
+    entries of deleted files are dropped.
+    """
+
+    def __init__(self, directory, filename_prefix='neat-checkpoint-'):
+        self.directory = directory
+        self.pattern = re.compile(re.escape(filename_prefix) + r'\d+(\.pack)?$')
+        self.path = os.path.join(directory, CATALOG_FILE)
+
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        self.refresh()
+
+    def refresh(self):
+        names = [name for name in os.listdir(self.directory) if self.pattern.match(name)]
+        changed = False
+        for name in names:
+            stat = os.stat(os.path.join(self.directory, name))
+            entry = self.entries.get(name)
+            if entry is not None and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                continue
+            entry = self.index(name)
+            entry['size'] = stat.st_size
+            entry['mtime'] = stat.st_mtime
+            self.entries[name] = entry
+            changed = True
+
+        for name in set(self.entries) - set(names):
+            del self.entries[name]
+            changed = True
+
+        if changed:
+            encoded = json.dumps(self.entries, sort_keys=True, separators=(',', ':')).encode('utf-8')
+            write_atomic(self.path, lambda f: f.write(encoded))
+
+    def index(self, name):
+        filename = os.path.join(self.directory, name)
+        if not name.endswith('.pack'):
+            with gzip.open(filename) as f:
+                generation, config, population, species_set, rndstate = pickle.load(f)
+            best_genome, best_fitness = best_of(list(population), [g.fitness for g in population.values()])
+            return {
+                'kind': 'pickle',
+                'generation': generation,
+                'best_genome': best_genome,
+                'best_fitness': best_fitness,
+                'population_size': len(population),
+                'species': [[key, len(s.members)] for key, s in species_set.species.items()],
+            }
+
+        with open(filename, 'rb') as f:
+            header, start = read_header(f)
+            state = read_section(f, start, header['population'])
+            genomes = read_section(f, start, header['genomes'])
+        fitnesses = [None if np.isnan(fitness) else fitness for fitness in state['population_fitness'].tolist()]
+        best_genome, best_fitness = best_of(state['population_keys'].tolist(), fitnesses)
+        sizes = np.diff(state['member_offsets']).tolist()
+        return {
+            'kind': 'pack',
+            'generation': state['generation'],
+            'best_genome': best_genome,
+            'best_fitness': best_fitness,
+            'population_size': len(fitnesses),
+            'species': [[key, size] for key, size in zip(state['species_keys'].tolist(), sizes)],
+            'previous': state['previous'],
+            # where the sections are, loading a genome skips the header
+            'start': start,
+            'population_section': header['population'],
+            'genomes_section': header['genomes'],
+            'genome_keys': genomes['genome_keys'].tolist(),
+        }
+
+    def checkpoints(self):
+        """ Names of the indexed checkpoints, oldest generation first. """
+        return sorted(self.entries, key=lambda name: self.entries[name]['generation'])
+
+    def latest(self):
+        names = self.checkpoints()
+        return names[-1] if names else None
+
+    def best(self):
+        """ The checkpoint holding the fittest genome, the latest one on ties. """
+        best = None
+        for name in self.checkpoints():
+            fitness = self.entries[name]['best_fitness']
+            if fitness is not None and (best is None or fitness >= self.entries[best]['best_fitness']):
+                best = name
+        return best
+
+    def load_genomes(self, name, keys, config):
+        """ The genomes with ``keys`` of the population saved in checkpoint ``name``. """
+        entry = self.entries[name]
+        if entry['kind'] == 'pickle':
+            with gzip.open(os.path.join(self.directory, name)) as f:
+                generation, old_config, population, species_set, rndstate = pickle.load(f)
+            return dict((key, population[key]) for key in keys)
+
+        # genomes a delta does not hold live in the checkpoints before it
+        wanted = {}
+        for key in keys:
+            location = name
+            while key not in self.entries[location]['genome_keys']:
+                location = self.entries[location]['previous']
+                if location is None:
+                    raise KeyError("Genome {0} is not in checkpoint {1}".format(key, name))
+            wanted.setdefault(location, []).append(key)
+
+        genomes = {}
+        for location, location_keys in wanted.items():
+            source = self.entries[location]
+            indices = [source['genome_keys'].index(key) for key in location_keys]
+            with open(os.path.join(self.directory, location), 'rb') as f:
+                data = read_section(f, source['start'], source['genomes_section'])
+            for genome in unpack_genomes(data, config, indices):
+                genomes[genome.key] = genome
+
+        # fitness is per checkpoint, elites carry theirs from one to the next
+        with open(os.path.join(self.directory, name), 'rb') as f:
+            state = read_section(f, entry['start'], entry['population_section'])
+        for key, fitness in zip(state['population_keys'].tolist(), state['population_fitness'].tolist()):
+            if key in genomes:
+                genomes[key].fitness = None if np.isnan(fitness) else fitness
+        return genomes
+
+    def load_best_genome(self, config, name=None):
+        """ The fittest genome of checkpoint ``name``, by default of the best checkpoint. """
+        if name is None:
+            name = self.best()
+        key = self.entries[name]['best_genome']
+        return self.load_genomes(name, [key], config)[key]
+
+    def load_species(self, name, species_key, config):
+        """ The members of one species of checkpoint ``name``, as a dict by genome key. """
+        entry = self.entries[name]
+        if entry['kind'] == 'pickle':
+            with gzip.open(os.path.join(self.directory, name)) as f:
+                generation, old_config, population, species_set, rndstate = pickle.load(f)
+            return dict(species_set.species[species_key].members)
+
+        with open(os.path.join(self.directory, name), 'rb') as f:
+            state = read_section(f, entry['start'], entry['population_section'])
+        i = state['species_keys'].tolist().index(species_key)
+        members = state['member_keys'][state['member_offsets'][i]:state['member_offsets'][i + 1]].tolist()
+        return self.load_genomes(name, members, config)
+
+    def restore(self, name, config):
+        """ The whole population of checkpoint ``name``, ready to go on training. """
+        filename = os.path.join(self.directory, name)
+        if self.entries[name]['kind'] == 'pickle':
+            return CheckPointer.restore_checkpoint(filename)
+        return BinaryCheckPointer.restore_checkpoint(filename, config)
@@ -0,0 +1,322 @@
+"""Saves and restores populations as packed numpy arrays, with deltas between checkpoints."""
+import json
+import os
+import random
+import struct
+import zlib
+from itertools import count
+
+import numpy as np
+
+from neat.population import Population
+from neat.species import Species
+
+from fitness_cache import genome_hash
+from utils import CheckPointer
+
+MAGIC = b'NEATPACK'
+FORMAT_VERSION = 1
+
+
+def optional(value):
+    return np.nan if value is None else value
+
+
+def from_optional(value):
+    return None if np.isnan(value) else float(value)
+
+
+def write_checkpoint(f, sections):
+    """
+    Writes ``sections``, a dict of dicts, to the binary file ``f``. Array values are packed into
+    one zlib block per section, the other values go to the JSON header as they are.
+
+    Layout: MAGIC, the format version and the header length as two uint32, the
+    header, then the compressed blocks. The header gives each block's offset and
+    length from the end of the header, so a single section can be read on its own.
+    """
+    header = {}
+    blocks = []
+    offset = 0
+    for name, values in sections.items():
+        arrays = []
+        raw = []
+        fields = {}
+        for key, value in values.items():
+            if isinstance(value, np.ndarray):
+                value = np.ascontiguousarray(value)
+                arrays.append([key, value.dtype.str, list(value.shape)])
+                raw.append(value.tobytes())
+            else:
+                fields[key] = value
+        block = zlib.compress(b''.join(raw), 6)
+        header[name] = {'offset': offset, 'length': len(block), 'arrays': arrays, 'fields': fields}
+        blocks.append(block)
+        offset += len(block)
+
+    encoded = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    f.write(MAGIC)
+    f.write(struct.pack('<II', FORMAT_VERSION, len(encoded)))
+    f.write(encoded)
+    for block in blocks:
+        f.write(block)
+
+
+def read_header(f):
+    """ The header of the packed checkpoint ``f`` and where its blocks start. """
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("{0} is not a packed checkpoint".format(f.name))
+    version, length = struct.unpack('<II', f.read(8))
+    if version != FORMAT_VERSION:
+        raise ValueError("Unknown checkpoint format {0} in {1}".format(version, f.name))
+    return json.loads(f.read(length).decode('utf-8')), f.tell()
+
+
+def read_section(f, start, section):
+    """ Decompresses one section, ``section`` is its entry in the header. """
+    f.seek(start + section['offset'])
+    raw = zlib.decompress(f.read(section['length']))
+    values = dict(section['fields'])
+    position = 0
+    for key, dtype, shape in section['arrays']:
+        dtype = np.dtype(dtype)
+        size = dtype.itemsize * int(np.prod(shape))
+        values[key] = np.frombuffer(raw, dtype, offset=position, count=size // dtype.itemsize).reshape(shape)
+        position += size
+    return values
+
+
+def read_checkpoint(filename, names=None):
+    """ The sections of ``filename`` as dicts, only the ones in ``names`` if given. """
+    sections = {}
+    with open(filename, 'rb') as f:
+        header, start = read_header(f)
+        for name, section in header.items():
+            if names is None or name in names:
+                sections[name] = read_section(f, start, section)
+    return sections
+
+
+def pack_genomes(genomes):
+    """
+    The nodes and connections of ``genomes`` as flat tables. The rows of genome i
+    are node_offsets[i]:node_offsets[i + 1] and conn_offsets[i]:conn_offsets[i + 1].
+    Genes keep their dict order, neat's mutations depend on it.
+    """
+    names = sorted(set(name for genome in genomes for node in genome.nodes.values()
+                       for name in (node.activation, node.aggregation)))
+    name_ids = dict((name, i) for i, name in enumerate(names))
+    nodes = [(key, node) for genome in genomes for key, node in genome.nodes.items()]
+    connections = [(key, conn) for genome in genomes for key, conn in genome.connections.items()]
+
+    return {
+        'names': names,
+        'genome_keys': np.array([genome.key for genome in genomes], dtype=np.int64),
+        'node_offsets': np.cumsum([0] + [len(genome.nodes) for genome in genomes], dtype=np.int64),
+        'conn_offsets': np.cumsum([0] + [len(genome.connections) for genome in genomes], dtype=np.int64),
+        'node_keys': np.array([key for key, node in nodes], dtype=np.int64),
+        'node_biases': np.array([node.bias for key, node in nodes], dtype=np.float64),
+        'node_responses': np.array([node.response for key, node in nodes], dtype=np.float64),
+        'node_activations': np.array([name_ids[node.activation] for key, node in nodes], dtype=np.uint8),
+        'node_aggregations': np.array([name_ids[node.aggregation] for key, node in nodes], dtype=np.uint8),
+        'conn_keys': np.array([key for key, conn in connections], dtype=np.int64).reshape(len(connections), 2),
+        'conn_weights': np.array([conn.weight for key, conn in connections], dtype=np.float64),
+        'conn_enabled': np.array([conn.enabled for key, conn in connections], dtype=np.bool_),
+    }
+
+
+def unpack_genomes(data, config, indices=None):
+    """ Genomes from the tables of pack_genomes(), all of them or the ones at ``indices``. """
+    genome_config = config.genome_config
+    names = data['names']
+    genome_keys = data['genome_keys'].tolist()
+    node_offsets = data['node_offsets'].tolist()
+    conn_offsets = data['conn_offsets'].tolist()
+    node_keys = data['node_keys'].tolist()
+    node_biases = data['node_biases'].tolist()
+    node_responses = data['node_responses'].tolist()
+    node_activations = data['node_activations'].tolist()
+    node_aggregations = data['node_aggregations'].tolist()
+    conn_keys = data['conn_keys'].tolist()
+    conn_weights = data['conn_weights'].tolist()
+    conn_enabled = data['conn_enabled'].tolist()
+
+    if indices is None:
+        indices = range(len(genome_keys))
+    genomes = []
+    for i in indices:
+        genome = config.genome_type(genome_keys[i])
+        for j in range(node_offsets[i], node_offsets[i + 1]):
+            node = genome_config.node_gene_type(node_keys[j])
+            node.bias = node_biases[j]
+            node.response = node_responses[j]
+            node.activation = names[node_activations[j]]
+            node.aggregation = names[node_aggregations[j]]
+            genome.nodes[node.key] = node
+        for j in range(conn_offsets[i], conn_offsets[i + 1]):
+            conn = genome_config.connection_gene_type(tuple(conn_keys[j]))
+            conn.weight = conn_weights[j]
+            conn.enabled = conn_enabled[j]
+            genome.connections[conn.key] = conn
+        genomes.append(genome)
+    return genomes
+
+
+def pack_species(species_set):
+    # dict order is kept here too, reproduction breaks fitness ties by it
+    species = list(species_set.species.values())
+    return {
+        'species_keys': np.array([s.key for s in species], dtype=np.int64),
+        'species_created': np.array([s.created for s in species], dtype=np.int64),
+        'species_last_improved': np.array([s.last_improved for s in species], dtype=np.int64),
+        'species_fitness': np.array([optional(s.fitness) for s in species], dtype=np.float64),
+        'species_adjusted_fitness': np.array([optional(s.adjusted_fitness) for s in species], dtype=np.float64),
+        'species_representatives': np.array([s.representative.key for s in species], dtype=np.int64),
+        'member_offsets': np.cumsum([0] + [len(s.members) for s in species], dtype=np.int64),
+        'member_keys': np.array([key for s in species for key in s.members], dtype=np.int64),
+        'history_offsets': np.cumsum([0] + [len(s.fitness_history) for s in species], dtype=np.int64),
+        'history': np.array([f for s in species for f in s.fitness_history], dtype=np.float64),
+    }
+
+
+def unpack_species(data, config, population):
+    species_set = config.species_set_type(config.species_set_config, None)
+    member_offsets = data['member_offsets'].tolist()
+    member_keys = data['member_keys'].tolist()
+    history_offsets = data['history_offsets'].tolist()
+    history = data['history'].tolist()
+
+    for i, key in enumerate(data['species_keys'].tolist()):
+        s = Species(key, int(data['species_created'][i]))
+        s.last_improved = int(data['species_last_improved'][i])
+        s.fitness = from_optional(data['species_fitness'][i])
+        s.adjusted_fitness = from_optional(data['species_adjusted_fitness'][i])
+        s.representative = population[int(data['species_representatives'][i])]
+        s.members = dict((gid, population[gid]) for gid in member_keys[member_offsets[i]:member_offsets[i + 1]])
+        s.fitness_history = history[history_offsets[i]:history_offsets[i + 1]]
+        species_set.species[key] = s
+        for gid in s.members:
+            species_set.genome_to_species[gid] = key
+    return species_set
+
+
+def load_population(filename, config):
+    """
+    The generation number and population stored in ``filename``. The genomes a delta
+    checkpoint does not hold come from the checkpoints it is based on.
+    """
+    sections = read_checkpoint(filename, ['population', 'genomes'])
+    state = sections['population']
+    genomes = dict((genome.key, genome) for genome in unpack_genomes(sections['genomes'], config))
+    if state['previous'] is not None:
+        previous = os.path.join(os.path.dirname(filename), state['previous'])
+        old_generation, old_population = load_population(previous, config)
+        for key in state['population_keys'].tolist():
+            if key not in genomes:
+                genomes[key] = old_population[key]
+
+    population = {}
+    for key, fitness in zip(state['population_keys'].tolist(), state['population_fitness'].tolist()):
+        genome = genomes[key]
+        genome.fitness = None if np.isnan(fitness) else fitness
+        population[key] = genome
+    return state['generation'], population
+
+
+class BinaryCheckPointer(CheckPointer):
+    """
+    A CheckPointer that stores populations as packed numpy arrays instead of pickles.
+
+    Genomes become flat tables of nodes and connections and the species keep their
+    bookkeeping but not the reporters, so a file no longer grows with the run's
+    statistics. Most checkpoints are deltas: they only hold the genomes that were
+    not in the previous checkpoint and name that file, every ``base_interval``
+    saves a full checkpoint starts a new chain. Restoring needs the config the run
+    was started with.
+
+    Instead of the whole state of ``random`` a save draws a seed, reseeds ``random``
+    with it and stores only the seed. A restored run goes on exactly like the run
+    that saved it.
+    """
+
+    def __init__(self, generation_interval=100, time_interval_seconds=300,
+                 filename_prefix='neat-checkpoint-', base_interval=10, background=True):
+        super(BinaryCheckPointer, self).__init__(generation_interval, time_interval_seconds, filename_prefix,
+                                                 background)
+        self.base_interval = base_interval
+
+        self.previous_filename = None
+        self.previous_genomes = {}
+        self.deltas = 0
+        # neat does not expose its key counters, keep track of the highest keys used
+        self.next_genome_key = 1
+        self.next_species_key = 1
+        self.next_node_key = 0
+
+    def end_generation(self, config, population, species_set):
+        self.next_genome_key = max([self.next_genome_key] + [key + 1 for key in population])
+        self.next_species_key = max([self.next_species_key] + [key + 1 for key in species_set.species])
+        self.next_node_key = max([self.next_node_key] + [key + 1 for genome in population.values()
+                                                         for key in genome.nodes])
+        # node keys also went to genomes that are gone by now, take the next one
+        # from neat's counter and hand it a fresh counter at the same place
+        genome_config = config.genome_config
+        if genome_config.node_indexer is not None:
+            self.next_node_key = max(self.next_node_key, next(genome_config.node_indexer))
+            genome_config.node_indexer = count(self.next_node_key)
+        super(BinaryCheckPointer, self).end_generation(config, population, species_set)
+
+    def save_checkpoint(self, config, population, species_set, generation):
+        """ Save the current simulation state. """
+        filename = '{0}{1}.pack'.format(self.filename_prefix, generation)
+        print("Saving checkpoint to {0}".format(filename))
+
+        base = self.previous_filename is None or self.deltas + 1 >= self.base_interval
+        keys = list(population)
+        new = [population[key] for key in keys if base or not self.saved_before(population[key])]
+        seed = random.getrandbits(63)
+        random.seed(seed)
+
+        state = {
+            'generation': generation,
+            'previous': None if base else os.path.basename(self.previous_filename),
+            'random_seed': seed,
+            'next_genome_key': self.next_genome_key,
+            'next_species_key': self.next_species_key,
+            'next_node_key': self.next_node_key,
+            'population_keys': np.array(keys, dtype=np.int64),
+            'population_fitness': np.array([optional(population[key].fitness) for key in keys], dtype=np.float64),
+        }
+        state.update(pack_species(species_set))
+        # the packed arrays are the snapshot, compressing them can happen in the background
+        sections = {'population': state, 'genomes': pack_genomes(new)}
+        self.write(filename, lambda f: write_checkpoint(f, sections))
+
+        self.deltas = 0 if base else self.deltas + 1
+        self.previous_filename = filename
+        self.previous_genomes = dict(population)
+
+    def saved_before(self, genome):
+        previous = self.previous_genomes.get(genome.key)
+        if previous is None:
+            return False
+        # elites are the same object, but runs restored from neat's own checkpoints
+        # reuse genome keys for other genomes
+        return previous is genome or genome_hash(previous) == genome_hash(genome)
+
+    @staticmethod
+    def restore_checkpoint(filename, config):
+        """Resumes the simulation from a previous saved point."""
+        generation, population = load_population(filename, config)
+        state = read_checkpoint(filename, ['population'])['population']
+        species_set = unpack_species(state, config, population)
+        random.seed(state['random_seed'])
+
+        # the saved generation is finished, go on with the next one
+        restored = Population(config, (population, species_set, generation + 1))
+        species_set.reporters = restored.reporters
+        # fresh counters would hand out keys that are already taken
+        restored.reproduction.genome_indexer = count(state['next_genome_key'])
+        species_set.indexer = count(state['next_species_key'])
+        config.genome_config.node_indexer = count(state['next_node_key'])
+        return restored
@@ -0,0 +1,101 @@
+"""
+The arena a game is played in: its size, physics and obstacles, and the obstacle
+patterns that can be played in it. Loaded from an INI file like the neat config,
+see config-environment.txt.
+"""
+from configparser import ConfigParser
+
+from patterns import PATTERNS
+
+
+class EnvSpec(object):
+    """
+    Everything GamePlay used to take from module constants. The defaults are the
+    game as it has always been played: a 300x600 arena with 3 obstacles falling in
+    5 lanes.
+
+    ``obstacle_speed`` is a fraction of the arena height per tick, the radii
+    default to a twelfth of the arena width. ``patterns`` maps pattern names to
+    their lanes, from 1 on the left to ``lanes`` on the right, by default the
+    built-in patterns that fit in ``lanes``.
+    """
+
+    OPTIONS = [('width', int), ('height', int), ('grid_size', int), ('gravity', float),
+               ('obstacle_speed', float), ('number_of_obstacles', int), ('lanes', int),
+               ('player_radius', int), ('obstacle_radius', int)]
+
+    def __init__(self, width=300, height=600, grid_size=1, gravity=2.5, obstacle_speed=0.01,
+                 number_of_obstacles=3, lanes=5, player_radius=None, obstacle_radius=None, patterns=None):
+        self.width = width
+        self.height = height
+        self.grid_size = grid_size
+        self.gravity = gravity
+        self.obstacle_speed = obstacle_speed
+        if number_of_obstacles < 1:
+            raise ValueError("Need at least 1 obstacle, got {0}".format(number_of_obstacles))
+        self.number_of_obstacles = number_of_obstacles
+        if lanes < 2:
+            raise ValueError("Need at least 2 lanes, got {0}".format(lanes))
+        self.lanes = lanes
+
+        self.grid_width = width / grid_size
+        self.grid_height = height / grid_size
+        self.scale_gravity = self.grid_height * gravity * 0.001
+        self.obstacle_step = self.grid_height * obstacle_speed
+        if player_radius is None:
+            player_radius = int(self.grid_width // 12)
+        if obstacle_radius is None:
+            obstacle_radius = int(self.grid_width // 12)
+        self.player_radius = player_radius
+        self.obstacle_radius = obstacle_radius
+        # lane 1 is on the left border, the last one on the right border
+        self.lane_width = int(self.grid_width // (lanes - 1))
+
+        if patterns is None:
+            # the built-in patterns that fit in the lanes
+            patterns = dict((name, pattern) for name, pattern in PATTERNS.items() if max(pattern) <= self.lanes)
+        self.patterns = dict((name, list(lanes)) for name, lanes in patterns.items())
+        for name, pattern in self.patterns.items():
+            if not pattern or not all(1 <= lane <= self.lanes for lane in pattern):
+                raise ValueError("Pattern {0!r} needs lanes between 1 and {1}, got {2}".format(
+                    name, self.lanes, pattern))
+
+    @property
+    def screen_size(self):
+        return self.width, self.height
+
+    def pattern(self, name):
+        try:
+            return self.patterns[name]
+        except KeyError:
+            raise KeyError("Unknown pattern {0!r}, known ones are {1}".format(name, ', '.join(sorted(self.patterns))))
+
+    def key(self):
+        """ Identifies the arena, games in arenas with the same key play the same. """
+        return tuple(getattr(self, name) for name, kind in self.OPTIONS)
+
+    @staticmethod
+    def load(filename):
+        """
+        Reads an [Environment] section with any of the options of the constructor,
+        and a [Patterns] section of ``name = lanes`` lines that adds to or replaces
+        the built-in patterns. Built-in patterns that need more lanes than the
+        arena has are left out.
+        """
+        parser = ConfigParser()
+        with open(filename) as f:
+            parser.read_file(f)
+
+        kwargs = {}
+        if parser.has_section('Environment'):
+            kinds = dict(EnvSpec.OPTIONS)
+            for name, value in parser.items('Environment'):
+                if name not in kinds:
+                    raise ValueError("Unknown option {0!r} in {1}".format(name, filename))
+                kwargs[name] = kinds[name](value)
+
+        patterns = dict(EnvSpec(**kwargs).patterns)
+        if parser.has_section('Patterns'):
+            for name, value in parser.items('Patterns'):
+                patterns[name] = [int(lane) for lane in value.split()]
+        return EnvSpec(patterns=patterns, **kwargs)
@@ -0,0 +1,251 @@
+import random
+import multiprocessing
+
+import numpy as np
+
+from GameComponent import AI, GamePlay, GameState, PlayerState
+from envspec import EnvSpec
+from inference import PopulationNetwork
+from patterns import ObstacleSchedule
+
+
+def react(player, output):
+    if output[0] > 0.5:  # we use a tanh activation function so result will be between -1 and 1. if over 0.5
+        # jump
+        player.jump(output[1] > 0)
+
+
+def evaluate_genomes(genomes, config, game_play, max_score, frame=None, early_stop=None):
+    """
+    Plays one game with a player per genome and sets every genome's fitness
+    to the score its player reached. ``frame(game_play)`` is called after every
+    tick when given, that is where rendering and the clock go. ``early_stop`` is an
+    optional EarlyStopPolicy that may end the game before every player is dead.
+
+    With a profiler on ``game_play`` every tick is timed as a whole ('tick') and
+    in parts, the frame callback on its own ('frame').
+    """
+    profiler = game_play.profiler
+    if profiler is not None:
+        t = profiler.time()
+    # one player per genome, players[x] plays genome x with network row x. The
+    # lists never shrink, dead players are masked out by their world state
+    networks = PopulationNetwork([genome for genome_id, genome in genomes], config)
+    players = []
+    game_play.prepare()
+    for genome_id, genome in genomes:
+        genome.fitness = 0  # start with fitness level of 0
+        new_player = AI(game_play.player_init_position, game_play.player_radius, game_play)
+        players.append(new_player)
+        game_play.add_player(new_player)
+
+    world = game_play.world
+    rows = np.array([player.index for player in players], dtype=np.intp)
+
+    game_play.start()
+    if early_stop is not None:
+        early_stop.start([genome_id for genome_id, genome in genomes])
+    survivor_fitness = None
+    if profiler is not None:
+        profiler.record('setup', t)
+
+    while game_play.state != GameState.ALL_DEAD:
+        if game_play.score > max_score:
+            break
+
+        if profiler is not None:
+            tick = t = profiler.time()
+        alive = np.flatnonzero(world.states[rows] == PlayerState.ALIVE.value)
+        if early_stop is not None:
+            stop = early_stop.check(game_play, rows, alive, max_score)
+            if stop is not None:
+                reason, survivor_fitness = stop
+                print("Generation stopped at score {0:.1f}: {1}".format(game_play.score, reason))
+                break
+            if profiler is not None:
+                t = profiler.record('early_stop', t)
+        if len(alive):
+            inputs = world.sensors(rows[alive])
+            if profiler is not None:
+                t = profiler.record('sensors', t)
+            outputs = networks.activate(alive, inputs)
+            if profiler is not None:
+                t = profiler.record('network', t)
+            # we use a tanh activation function so result will be between -1 and 1. if over 0.5 jump
+            jumps = np.flatnonzero(outputs[:, 0] > 0.5)
+            for x in jumps:
+                players[alive[x]].jump(outputs[x, 1] > 0)
+            if profiler is not None:
+                profiler.record('jumps', t)
+                profiler.count('players', len(alive))
+                profiler.count('jumps', len(jumps))
+
+        game_play.step()
+
+        if profiler is not None:
+            t = profiler.record('tick', tick)
+        if frame is not None:
+            frame(game_play)
+            if profiler is not None:
+                profiler.record('frame', t)
+
+    # the score a player died with, or the score it is still playing at
+    if survivor_fitness is None:
+        survivor_fitness = game_play.score
+    for (genome_id, genome), player in zip(genomes, players):
+        if player.state == PlayerState.DEAD:
+            genome.fitness = player.dead_score
+        else:
+            genome.fitness = survivor_fitness
+
+
+class EarlyStopPolicy(object):
+    """
+    Ends a generation's game before every player is dead when playing on cannot
+    change what neat does with the result.
+
+    - ``fitness_threshold``: every survivor already has at least this fitness.
+      The survivors are credited with the score of a full game, like a cycle
+      does below. Otherwise a survivor's fitness would depend on which of the two
+      fires first, and that depends on who else is still alive. A survivor that
+      would have died before ``max_score`` is credited too much, which only
+      matters past the threshold where neat stops anyway.
+    - ``species_set``: all survivors belong to one species, so the ranking of the
+      species by their best member can no longer change. The survivors keep the
+      score at the stop, which lowers that species' average fitness compared to a
+      full game.
+    - ``detect_cycles``: with a single obstacle pattern the game is periodic. When
+      the survivors and the obstacles come back to a state seen at an earlier
+      respawn, the game repeats forever and nobody dies any more, the survivors
+      are credited with the score they would have stopped at after ``max_score``.
+    """
+
+    def __init__(self, fitness_threshold=None, species_set=None, detect_cycles=True):
+        self.fitness_threshold = fitness_threshold
+        self.species_set = species_set
+        self.detect_cycles = detect_cycles
+
+        self.genome_ids = []
+        self.alive_count = None
+        self.lanes_seen = None
+        self.states_seen = {}
+
+    def for_shard(self):
+        """ A copy for a worker, species only make sense for the whole population. """
+        return EarlyStopPolicy(self.fitness_threshold, None, self.detect_cycles)
+
+    def start(self, genome_ids):
+        self.genome_ids = genome_ids
+        self.alive_count = None
+        self.lanes_seen = None
+        self.states_seen = {}
+
+    def check(self, game_play, rows, alive, max_score):
+        """
+        ``alive`` are the positions in the genome list of the players still alive,
+        ``rows`` their world rows. Returns None to play on, or a (reason, survivor
+        fitness) pair where a None fitness means the current score.
+        """
+        if len(alive) == 0:
+            return None
+
+        if self.fitness_threshold is not None and game_play.score >= self.fitness_threshold:
+            return 'every survivor passed the fitness threshold', self.final_score(max_score)
+
+        if self.species_set is not None and len(alive) != self.alive_count:
+            self.alive_count = len(alive)
+            genome_to_species = self.species_set.genome_to_species
+            species = set(genome_to_species.get(self.genome_ids[x]) for x in alive)
+            if len(species) == 1:
+                return 'only species {0} has survivors, the species ranking is settled'.format(species.pop()), None
+
+        if self.detect_cycles and len(game_play.obstacle_patterns) == 1:
+            lanes = game_play.lanes
+            # the state can only repeat right after a respawn, check once per lane
+            if lanes.consumed != self.lanes_seen:
+                self.lanes_seen = lanes.consumed
+                state = self.state_key(game_play, rows[alive])
+                tick = self.states_seen.get(state)
+                if tick is not None:
+                    return ('survivors repeat the state of tick {0} and will never die'.format(tick),
+                            self.final_score(max_score))
+                self.states_seen[state] = game_play.current_fps
+
+        return None
+
+    @staticmethod
+    def final_score(max_score):
+        # the score is current_fps / 7 and the game ends on the first tick past max_score
+        ticks = int(max_score * 7)
+        while ticks / 7 <= max_score:
+            ticks += 1
+        return ticks / 7
+
+    @staticmethod
+    def state_key(game_play, rows):
+        """ Everything the rest of the game depends on, apart from the score. """
+        world = game_play.world
+        # jump() only cares whether the last jump is at least 7 ticks old
+        cooldown = np.minimum(game_play.current_fps - world.last_jumps[rows], 7)
+        period = len(game_play.obstacle_patterns[0])
+        return (rows.tobytes(), world.positions[rows].tobytes(), world.velocities[rows].tobytes(),
+                cooldown.tobytes(), world.obstacle_positions.tobytes(), game_play.lanes.consumed % period)
+
+
+def evaluate_shard(genomes, config, schedule, max_score, early_stop, spec=None):
+    """ Runs in a worker: a headless game for a slice of the population. """
+    game_play = GamePlay(0, headless=True, schedule=schedule, spec=spec)
+    evaluate_genomes(genomes, config, game_play, max_score, early_stop=early_stop)
+    return [genome.fitness for genome_id, genome in genomes]
+
+
+class ShardedEvaluator(object):
+    """
+    Fitness function for ``Population.run`` that splits the genomes across a pool
+    of processes. Every worker plays its own headless game from the same obstacle
+    schedule, so all shards see the same obstacles and their fitness stays comparable.
+    """
+
+    def __init__(self, num_workers, pattern, max_score, early_stop=None, cache=None, spec=None):
+        self.num_workers = num_workers
+        self.pattern = pattern
+        self.max_score = max_score
+        if spec is None:
+            spec = EnvSpec()
+        self.spec = spec
+        self.cache = cache
+        self.early_stop = None
+        if early_stop is not None:
+            self.early_stop = early_stop.for_shard()
+        # spawn, the parent may hold a window that must not be shared with children.
+        # Workers import the game and the main script again, neither loads pygame
+        context = multiprocessing.get_context('spawn')
+        self.pool = context.Pool(num_workers)
+
+    def evaluate(self, genomes, config):
+        schedule = ObstacleSchedule.for_pattern(self.pattern, random.randrange(2 ** 32), self.spec)
+        if self.cache is None:
+            self.play(genomes, config, schedule)
+        else:
+            self.cache.evaluate(genomes, (schedule.key(), self.spec.key(), self.max_score),
+                                lambda pending: self.play(pending, config, schedule))
+
+    def play(self, genomes, config, schedule):
+        size = (len(genomes) + self.num_workers - 1) // self.num_workers
+        shards = [genomes[i:i + size] for i in range(0, len(genomes), size)]
+        jobs = [self.pool.apply_async(evaluate_shard, (shard, config, schedule, self.max_score,
+                                                              self.early_stop, self.spec))
+                for shard in shards]
+        for shard, job in zip(shards, jobs):
+            for (genome_id, genome), fitness in zip(shard, job.get()):
+                genome.fitness = fitness
+
+    def close(self):
+        """ Waits for the workers to finish and stops them. """
+        self.pool.close()
+        self.pool.join()
+
+    def terminate(self):
+        """ Stops the workers right away, whatever they are playing. Safe after close(). """
+        self.pool.terminate()
+        self.pool.join()
@@ -0,0 +1,72 @@
+import hashlib
+from collections import OrderedDict
+
+
+def genome_hash(genome):
+    """
+    Hash of everything the network of ``genome`` is built from: its nodes and its
+    enabled connections, in key order. Two genomes with the same hash play exactly
+    the same, whatever their genome key or fitness.
+    """
+    nodes = sorted((key, node.bias, node.response, node.activation, node.aggregation)
+                   for key, node in genome.nodes.items())
+    connections = sorted((key, connection.weight)
+                         for key, connection in genome.connections.items() if connection.enabled)
+    return hashlib.sha1(repr((nodes, connections)).encode('utf-8')).hexdigest()
+
+
+class FitnessCache(object):
+    """
+    Remembers the fitness of genomes already played under a scenario.
+
+    Players never interact, so a genome's fitness only depends on its network and
+    the game it plays: the obstacle lanes and the score limit, that is the
+    ``scenario``. The elites neat copies into every generation are looked up here
+    instead of being played again. At most ``size`` entries are kept, the least
+    recently used ones are dropped first.
+    """
+
+    def __init__(self, size=1000):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        fitness = self.entries.get(key)
+        if fitness is not None:
+            self.entries.move_to_end(key)
+        return fitness
+
+    def put(self, key, fitness):
+        self.entries[key] = fitness
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def evaluate(self, genomes, scenario, evaluate):
+        """
+        Sets the fitness of every genome, from the cache when possible. The others are
+        passed to ``evaluate(genomes)`` in one go, genomes with the same network
+        only once.
+        """
+        pending = OrderedDict()
+        for genome_id, genome in genomes:
+            key = (genome_hash(genome), scenario)
+            fitness = self.get(key)
+            if fitness is not None:
+                genome.fitness = fitness
+                self.hits += 1
+            else:
+                pending.setdefault(key, []).append(genome)
+
+        if not pending:
+            return
+        self.misses += len(pending)
+        played = [genomes_of_key[0] for genomes_of_key in pending.values()]
+        evaluate([(genome.key, genome) for genome in played])
+        for key, genomes_of_key in pending.items():
+            fitness = genomes_of_key[0].fitness
+            self.put(key, fitness)
+            for genome in genomes_of_key[1:]:
+                genome.fitness = fitness
@@ -0,0 +1,119 @@
+import math
+
+import numpy as np
+
+import artifact
+from artifact import compile_network
+
+
+def exact(f, z):
+    """
+    ``f`` of every element of ``z`` with the math module. np.tanh and np.exp are
+    off by an ulp now and then, enough to flip a decision right at its threshold
+    between training and replaying a genome.
+    """
+    return np.fromiter(map(f, z.tolist()), dtype=float, count=len(z))
+
+
+def tanh_activation(z):
+    return exact(math.tanh, np.clip(2.5 * z, -60.0, 60.0))
+
+
+def sigmoid_activation(z):
+    return 1.0 / (1.0 + exact(math.exp, -np.clip(5.0 * z, -60.0, 60.0)))
+
+
+def relu_activation(z):
+    return np.where(z > 0.0, z, 0.0)
+
+
+def identity_activation(z):
+    return z
+
+
+# numpy versions of the activation functions of the same name in artifact.ACTIVATIONS,
+# with the same results
+BATCHED_ACTIVATIONS = {
+    'tanh': tanh_activation,
+    'sigmoid': sigmoid_activation,
+    'relu': relu_activation,
+    'identity': identity_activation,
+}
+# every activation compile_network() allows, a KeyError here means one has no numpy version
+ACTIVATIONS = [(name, BATCHED_ACTIVATIONS[name]) for name in sorted(artifact.ACTIVATIONS)]
+
+
+class PopulationNetwork(object):
+    """
+    The feed-forward networks of a whole generation compiled into one array program.
+
+    Every genome becomes a row of padded arrays: its nodes are slots in the order
+    FeedForwardNetwork would evaluate them, and each slot lists the value columns it
+    reads and their weights. activate() then runs slot by slot for all the requested
+    rows at once, instead of one network.activate() call per player.
+    """
+
+    def __init__(self, genomes, config):
+        activation_ids = dict((name, i) for i, (name, f) in enumerate(ACTIVATIONS))
+        nets = [compile_network(genome, config) for genome in genomes]
+
+        self.num_inputs = len(config.genome_config.input_keys)
+        self.num_slots = max([len(nodes) for num_inputs, nodes, outputs in nets] + [0])
+        max_links = max([len(links) for num_inputs, nodes, outputs in nets
+                         for activation, bias, response, links in nodes] + [1])
+        # last column of the values is always 0.0, it stands for padding and unevaluated nodes
+        self.zero = self.num_inputs + self.num_slots
+
+        shape = (len(nets), self.num_slots)
+        self.sources = np.full(shape + (max_links,), self.zero, dtype=np.intp)
+        self.weights = np.zeros(shape + (max_links,))
+        self.biases = np.zeros(shape)
+        self.responses = np.zeros(shape)
+        self.activations = np.zeros(shape, dtype=np.uint8)
+        self.outputs = np.full((len(nets), len(config.genome_config.output_keys)), self.zero, dtype=np.intp)
+
+        for row, (num_inputs, nodes, outputs) in enumerate(nets):
+            # a node's value column is its slot after the inputs, only the zero column moves
+            for slot, (activation, bias, response, links) in enumerate(nodes):
+                for j, (source, weight) in enumerate(links):
+                    self.sources[row, slot, j] = source
+                    self.weights[row, slot, j] = weight
+                self.biases[row, slot] = bias
+                self.responses[row, slot] = response
+                self.activations[row, slot] = activation_ids[activation]
+            for j, column in enumerate(outputs):
+                if column < num_inputs + len(nodes):
+                    self.outputs[row, j] = column
+
+        # slots where every genome uses the same activation skip the masking
+        self.slot_activations = []
+        for slot in range(self.num_slots):
+            ids = np.unique(self.activations[:, slot])
+            self.slot_activations.append(ACTIVATIONS[ids[0]][1] if len(ids) == 1 else None)
+
+    def activate(self, rows, inputs):
+        """
+        Evaluate the networks at ``rows`` on the matching rows of ``inputs``.
+        Returns a (len(rows), num_outputs) array.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        count = len(rows)
+        values = np.zeros((count, self.zero + 1))
+        values[:, :self.num_inputs] = inputs
+        select = np.arange(count)[:, np.newaxis]
+
+        for slot in range(self.num_slots):
+            terms = values[select, self.sources[rows, slot]] * self.weights[rows, slot]
+            # cumsum adds from left to right like sum() in FeedForwardNetwork
+            total = terms.cumsum(axis=1)[:, -1]
+            z = self.biases[rows, slot] + self.responses[rows, slot] * total
+
+            if self.slot_activations[slot] is not None:
+                values[:, self.num_inputs + slot] = self.slot_activations[slot](z)
+                continue
+            activations = self.activations[rows, slot]
+            for activation_id in np.unique(activations):
+                mask = activations == activation_id
+                values[mask, self.num_inputs + slot] = ACTIVATIONS[activation_id][1](z[mask])
+
+        return values[select, self.outputs[rows]]
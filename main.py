@@ -1,7 +1,18 @@
-import pygame
 import neat
 import os
+import sys
 import pickle
+# pygame and render are only imported by the functions that draw, the workers of
+# a sharded run import this module again and must not load pygame
+from checkpoint import BinaryCheckPointer
+from catalog import CheckpointCatalog
+from artifact import export_winner, load_winner
+from GameComponent import GamePlay, AI, GameState, PlayerState, SimulationClock
+from envspec import EnvSpec
+from evaluation import evaluate_genomes, react, ShardedEvaluator, EarlyStopPolicy
+from fitness_cache import FitnessCache
+from profiling import Profiler, ProfileReporter
+from random import randrange, seed as random_seed
 
 max_score = 2000
 gen = 0
@@ -9,28 +20,49 @@ DRAW_LINES = True
 the_pattern = None
 FPS = 150
 every = 5
+# train without a window: no drawing and no frame rate cap
+HEADLESS = False
+# watching training: draw every n-th tick only, the game runs n times faster
+RENDER_EVERY = 1
+# watching training: draw at most this many frames per second and let the game
+# run as fast as it can in between, None => one frame per tick at FPS
+RENDER_FPS = None
+frame_pacer = None
+# playing in real time: frames drawn per second, the game ticks at its own FPS
+# and frames in between ticks are interpolated
+DISPLAY_FPS = 60
+# > 1 => training shards every generation across this many headless processes
+WORKERS = 1
+# set to an int to make training runs reproducible
+SEED = None
+# go on from the latest checkpoint of the pattern instead of a new population
+RESUME = False
+# end a generation early once the survivors cannot change the outcome any more
+EARLY_STOP = True
+# also stop when only one species has survivors left, changes the species' average fitness
+EARLY_STOP_SPECIES = False
+early_stop = None
+# genomes already played on the same obstacles keep their fitness, 0 => play every genome
+FITNESS_CACHE = 1000
+fitness_cache = None
+# an arena file like config-environment.txt, None => the default arena
+ENV_FILE = None
+env_spec = None
+# time the phases of every generation and print percentiles, PROFILE_FILE also
+# appends them as JSON lines. Workers are not profiled
+PROFILE = False
+PROFILE_FILE = None
+profiler = None
+
+
+def network_inputs(player, g_play):
+    # the inputs training builds for the whole generation, with fewer than 3
+    # obstacles the missing ones are padded the same way
+    return tuple(g_play.world.sensors([player.index])[0].tolist())
 
 
 def jump_or_not(player, g_play, network):
-    p_position = player.position
-    obstacles = g_play.closest_obstacles(player)
-    o_1 = obstacles[0]
-    o_2 = obstacles[1]
-    o_3 = obstacles[2]
-    # diff = time.time() - player.last_jump
-
-    output = network.activate(
-        (p_position[0], p_position[1],
-         g_play.grid_width - p_position[0], g_play.grid_height - p_position[1],
-         o_1[0][0] - p_position[0], o_1[0][1] - p_position[1],
-         o_2[0][0] - p_position[0], o_2[0][1] - p_position[1],
-         o_3[0][0] - p_position[0], o_3[0][1] - p_position[1],
-         )
-    )
-
-    if output[0] > 0.5:  # we use a tanh activation function so result will be between -1 and 1. if over 0.5
-        # jump
-        player.jump(output[1] > 0)
+    react(player, network.activate(network_inputs(player, g_play)))
 
 
 def eval_genomes(genomes, eval_config):
@@ -39,149 +71,191 @@ def eval_genomes(genomes, eval_config):
     birds and sets their fitness based on the distance they
     reach in the game.
     """
-    global gen
+    global gen, frame_pacer
     gen += 1
 
-    game_play = GamePlay(FPS, gen, DRAW_LINES, the_pattern)
-    fpsClock = game_play.get_fps_clock
+    game_play = GamePlay(FPS, gen, DRAW_LINES, the_pattern, headless=HEADLESS, seed=randrange(2 ** 32),
+                         spec=env_spec, profiler=profiler)
+    frame = None
+    if not HEADLESS:
+        from render import FramePacer
+        frame = show_frame
+        frame_pacer = FramePacer(RENDER_EVERY, RENDER_FPS)
+    if fitness_cache is None:
+        evaluate_genomes(genomes, eval_config, game_play, max_score, frame, early_stop)
+    else:
+        # cached genomes skip the game, only the others are on screen
+        hits = fitness_cache.hits
+        fitness_cache.evaluate(genomes, (game_play.schedule.key(), game_play.spec.key(), max_score),
+                               lambda pending: evaluate_genomes(pending, eval_config, game_play, max_score, frame,
+                                                                early_stop))
+        if profiler is not None:
+            profiler.count('cached', fitness_cache.hits - hits)
 
-    # start by creating lists holding the genome itself, the
-    # neural network associated with the genome and the
-    # bird object that uses that network to play
-    nets = []
-    players = []
-    ge = []
-    # print(len(genomes))
-    game_play.prepare()
-    for genome_id, genome in genomes:
-        genome.fitness = 0  # start with fitness level of 0
-        net = neat.nn.FeedForwardNetwork.create(genome, eval_config)
-        nets.append(net)
-        new_player = AI(game_play.screen, game_play.player_init_position, game_play.player_radius, game_play)
-        players.append(new_player)
-        game_play.add_player(new_player)
-        ge.append(genome)
 
-    game_play.start()
+def show_frame(game_play):
+    import pygame
+    from pygame.locals import QUIT
 
-    grid_width = game_play.grid_width
-    grid_height = game_play.grid_height
+    if not frame_pacer.due(game_play.current_fps):
+        return
+    for event in pygame.event.get():
+        if event.type == QUIT:
+            pygame.quit()
+            sys.exit()
+        # game_play.check_event(event
 
-    # print(len(players))
+    pygame.display.update(game_play.render())
+    if RENDER_FPS is None:
+        game_play.get_fps_clock.tick(FPS)
 
-    while game_play.state != GameState.ALL_DEAD:
-        if game_play.score > max_score:
-            break
 
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                pygame.quit()
-                sys.exit()
-            # game_play.check_event(event
+def all_dead(game_play):
+    return game_play.state == GameState.ALL_DEAD
+
 
-        for x, player in enumerate(players):  # give each bird a fitness of 0.1 for each frame it stays alive
+def play_ticks(game_play, ticks, players, nets, over=all_dead):
+    """
+    Play the ``ticks`` ticks that are due of a game running in real time, the AI
+    players decide before every tick like in training.
+    """
+    for i in range(ticks):
+        if over(game_play):
+            return
+        for player, network in zip(players, nets):
             if player.state == PlayerState.DEAD:
                 continue
-
-            # ge[x].fitness += 0.1
-            ge[x].fitness = game_play.score
-            network = nets[players.index(player)]
             jump_or_not(player, game_play, network)
-
-        for player in players:
-            if player.state == PlayerState.DEAD:
-                ge[players.index(player)].fitness = player.dead_score
-                nets.pop(players.index(player))
-                ge.pop(players.index(player))
-                players.pop(players.index(player))
-
-        game_play.draw()
-
-        pygame.display.flip()
-        pygame.display.update()
-        fpsClock.tick(FPS)
+        game_play.step()
 
 
 def train_model(config_file, pattern):
     config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
                                 neat.DefaultSpeciesSet, neat.DefaultStagnation,
                                 config_file)
-    global the_pattern
+    global the_pattern, early_stop, fitness_cache, profiler
     the_pattern = pattern
-
-    # Create the population, which is the top-level object for a NEAT run.
-    p = neat.Population(config)
-    # p = neat.Checkpointer.restore_checkpoint('neat-checkpoint-439')
+    if SEED is not None:
+        # neat and the obstacle seeds of every generation both draw from random
+        random_seed(SEED)
 
     prefix = './pattern-' + str(pattern) + '/';
 
+    # Create the population, which is the top-level object for a NEAT run.
+    p = None
+    if RESUME and os.path.isdir(prefix):
+        catalog = CheckpointCatalog(prefix)
+        latest = catalog.latest()
+        if latest is not None:
+            print("Resuming from {0}".format(latest))
+            p = catalog.restore(latest, config)
+    if p is None:
+        p = neat.Population(config)
+
     # Add a stdout reporter to show progress in the terminal.
     p.add_reporter(neat.StdOutReporter(True))
     stats = neat.StatisticsReporter()
     p.add_reporter(stats)
-    p.add_reporter(neat.Checkpointer(every, filename_prefix=prefix + 'neat-checkpoint-'))
+    checkpointer = BinaryCheckPointer(every, filename_prefix=prefix + 'neat-checkpoint-')
+    p.add_reporter(checkpointer)
+    if PROFILE:
+        profiler = Profiler()
+        p.add_reporter(ProfileReporter(profiler, filename=PROFILE_FILE))
+
+    if EARLY_STOP:
+        fitness_threshold = None
+        if not config.no_fitness_termination:
+            fitness_threshold = config.fitness_threshold
+        species_set = None
+        if EARLY_STOP_SPECIES:
+            species_set = p.species
+        early_stop = EarlyStopPolicy(fitness_threshold, species_set)
+    if FITNESS_CACHE and not (EARLY_STOP and EARLY_STOP_SPECIES):
+        # stopping on species makes a fitness depend on the rest of the population
+        fitness_cache = FitnessCache(FITNESS_CACHE)
 
     # Run for up to 200 generations.
-    winner = p.run(eval_genomes, 20000)
+    if WORKERS > 1:
+        evaluator = ShardedEvaluator(WORKERS, pattern, max_score, early_stop, fitness_cache, env_spec)
+        try:
+            winner = p.run(evaluator.evaluate, 20000)
+            evaluator.close()
+        finally:
+            # on extinction or Ctrl-C the workers may still be playing, the pool would keep running
+            evaluator.terminate()
+    else:
+        winner = p.run(eval_genomes, 20000)
+    checkpointer.flush()
 
     with open(prefix + 'winner.pkl', 'wb') as output:
         pickle.dump(winner, output, 1)
+    export_winner(winner, config, prefix + 'winner.npz')
 
     # show final stats
     print('\nBest genome:\n{!s}'.format(winner))
 
 
+def load_network(config_file, pattern):
+    """
+    The winner of ``pattern`` from its compiled winner.npz. The pickled genome is
+    only compiled when winner.npz is missing or older, without winner.pkl the
+    winner.npz is used as it is.
+    """
+    prefix = './pattern-' + str(pattern) + '/'
+    compiled = prefix + 'winner.npz'
+    source = prefix + 'winner.pkl'
+    if not os.path.exists(compiled) or \
+            (os.path.exists(source) and os.path.getmtime(compiled) < os.path.getmtime(source)):
+        config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                                    neat.DefaultSpeciesSet, neat.DefaultStagnation,
+                                    config_file)
+        with open(source, 'rb') as input_file:
+            genome = pickle.load(input_file)
+        export_winner(genome, config, compiled)
+    return load_winner(compiled)
+
+
 def run_model(config_file, pattern):
-    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
-                                neat.DefaultSpeciesSet, neat.DefaultStagnation,
-                                config_file)
+    import pygame
+    from pygame.locals import QUIT
 
-    game_play = GamePlay(FPS, draw_line=DRAW_LINES, the_pattern=pattern)
+    game_play = GamePlay(FPS, draw_line=DRAW_LINES, the_pattern=pattern, spec=env_spec)
     fpsClock = game_play.get_fps_clock
 
-    with open('./pattern-' + str(pattern) + '/winner.pkl', 'rb') as input_file:
-        genome = pickle.load(input_file)
-
     nets = []
     players = []
     game_play.prepare()
 
     for i in range(1):
-        net = neat.nn.FeedForwardNetwork.create(genome, config)
+        net = load_network(config_file, pattern)
         nets.append(net)
-        new_ai = AI(game_play.screen, game_play.player_init_position, game_play.player_radius, game_play)
+        new_ai = AI(game_play.player_init_position, game_play.player_radius, game_play)
         players.append(new_ai)
         game_play.add_player(new_ai)
 
     game_play.start()
 
-    while game_play.state != GameState.ALL_DEAD:
+    clock = SimulationClock(game_play.FPS)
+    while not all_dead(game_play):
         for event in pygame.event.get():
             if event.type == QUIT:
                 pygame.quit()
                 sys.exit()
             game_play.check_event(event)
 
-        for player in players:
-            network = nets[players.index(player)]
-            jump_or_not(player, game_play, network)
-
-        for player in players:
-            if player.state == PlayerState.DEAD:
-                nets.pop(players.index(player))
-                players.pop(players.index(player))
-
-        game_play.draw()
-        pygame.display.flip()
-        pygame.display.update()
-        fpsClock.tick(FPS)
+        play_ticks(game_play, clock.advance(), players, nets)
+        pygame.display.update(game_play.render(clock.alpha))
+        fpsClock.tick(DISPLAY_FPS)
     print('Best Score: ', game_play.score)
 
 
 def play_by_yourself(config_file, pattern):
+    import pygame
+    from pygame.locals import QUIT
+
     FPS = 20
     DRAW_LINES = False
-    game_play = GamePlay(FPS, draw_line=DRAW_LINES, the_pattern=pattern)
+    game_play = GamePlay(FPS, draw_line=DRAW_LINES, the_pattern=pattern, spec=env_spec)
     fpsClock = game_play.get_fps_clock
 
     nets = []
@@ -190,69 +264,57 @@ def play_by_yourself(config_file, pattern):
 
     game_play.add_main_player()
 
-    while game_play.state != GameState.ALL_DEAD:
+    clock = SimulationClock(game_play.FPS)
+    while not all_dead(game_play):
         for event in pygame.event.get():
             if event.type == QUIT:
                 pygame.quit()
                 sys.exit()
             game_play.check_event(event)
 
-        game_play.draw()
-        pygame.display.flip()
-        pygame.display.update()
-        fpsClock.tick(FPS)
+        play_ticks(game_play, clock.advance(), players, nets)
+        pygame.display.update(game_play.render(clock.alpha))
+        fpsClock.tick(DISPLAY_FPS)
     print('Best Score: ', game_play.score)
 
 
 def play_against_model(config_file, pattern):
-    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
-                                neat.DefaultSpeciesSet, neat.DefaultStagnation,
-                                config_file)
+    import pygame
+    from pygame.locals import QUIT
 
     FPS = 20
     DRAW_LINES = False
-    game_play = GamePlay(FPS, draw_line=DRAW_LINES, the_pattern=pattern)
+    game_play = GamePlay(FPS, draw_line=DRAW_LINES, the_pattern=pattern, spec=env_spec)
     fpsClock = game_play.get_fps_clock
 
-    with open('./pattern-' + str(pattern) + '/winner.pkl', 'rb') as input_file:
-        genome = pickle.load(input_file)
-
     nets = []
     players = []
     game_play.prepare()
 
     for i in range(1):
-        net = neat.nn.FeedForwardNetwork.create(genome, config)
+        net = load_network(config_file, pattern)
         nets.append(net)
-        new_ai = AI(game_play.screen, game_play.player_init_position, game_play.player_radius, game_play)
+        new_ai = AI(game_play.player_init_position, game_play.player_radius, game_play)
         players.append(new_ai)
         game_play.add_player(new_ai)
 
     game_play.add_main_player()
 
-    while game_play.state != GameState.ALL_DEAD:
+    def over(game_play):
+        # one of the two is dead, that is a winner
+        return all_dead(game_play) or len(game_play.dead_players) == 1
+
+    clock = SimulationClock(game_play.FPS)
+    while not over(game_play):
         for event in pygame.event.get():
             if event.type == QUIT:
                 pygame.quit()
                 sys.exit()
             game_play.check_event(event)
 
-        for player in players:
-            network = nets[players.index(player)]
-            jump_or_not(player, game_play, network)
-
-        for player in players:
-            if player.state == PlayerState.DEAD:
-                nets.pop(players.index(player))
-                players.pop(players.index(player))
-
-        game_play.draw()
-        pygame.display.flip()
-        pygame.display.update()
-        fpsClock.tick(FPS)
-
-        if len(game_play.dead_players) == 1:
-            break
+        play_ticks(game_play, clock.advance(), players, nets, over)
+        pygame.display.update(game_play.render(clock.alpha))
+        fpsClock.tick(DISPLAY_FPS)
 
     print('Best Score: ', game_play.score)
 
@@ -272,6 +334,8 @@ switcher = {
 if __name__ == '__main__':
     local_dir = os.path.dirname(__file__)
     config_path = os.path.join(local_dir, 'config-feedforward.txt')
+    if ENV_FILE is not None:
+        env_spec = EnvSpec.load(ENV_FILE)
 
     main_menu = 'Choose menu: \n1.Train Model\n2.Run Model\n3.Play by yourself\n4.Play against Model\nChosen input: '
     # run(config_path)
@@ -284,23 +348,18 @@ if __name__ == '__main__':
             break
         print("Incorrect input! Please try again!!\n")
 
-    pattern_menu = 'What pattern?: \n1.A\n2.B\n3.C\nChosen input: '
+    # the built-in patterns that fit the arena and the ones of the arena file
+    pattern_names = sorted((env_spec or EnvSpec()).patterns)
+    pattern_menu = 'What pattern?: \n' + ''.join('{0}.{1}\n'.format(i + 1, name.upper())
+                                                for i, name in enumerate(pattern_names)) + 'Chosen input: '
+    choices = [str(i + 1) for i in range(len(pattern_names))]
     while True:
         chosen_pattern = input(pattern_menu)
-        if chosen_pattern in ['1', '2', '3']:
+        if chosen_pattern in choices:
             break
         print("Incorrect input! Please try again!!\n")
 
-    chosen_pattern = {
-        '1': 'a',
-        '2': 'b',
-        '3': 'c'
-    }.get(chosen_pattern)
-
-    from GameComponent import *
-
-    pygame.init()
-    pygame.display.set_caption("Bouncy Ball")
+    chosen_pattern = pattern_names[int(chosen_pattern) - 1]
 
     chosen_menu = int(chosen_menu)
     func = switcher.get(chosen_menu)
@@ -0,0 +1,107 @@
+from random import Random
+
+# obstacle lanes from left (1) to right (5), one lane per respawn
+PATTERNS = {
+    'a': [1, 2, 3, 4, 5],
+    'b': [5, 4, 3, 2, 1],
+    'c': [2, 4, 2, 4, 3],
+    # 'd': [1, 5, 2, 4, 3],
+}
+
+
+class ObstacleSchedule(object):
+    """
+    The order in which obstacle patterns are played, drawn from its own seeded
+    random stream so the same seed always gives the same obstacles.
+
+    The schedule only depends on ``patterns`` and ``seed``: it can be pickled to
+    workers or kept to re-simulate a generation, and every stream() of it yields
+    exactly the same lanes.
+    """
+
+    def __init__(self, patterns, seed=None):
+        if seed is None:
+            seed = Random().randrange(2 ** 32)
+        self.patterns = [list(pattern) for pattern in patterns]
+        self.seed = seed
+
+    @staticmethod
+    def for_pattern(the_pattern, seed=None, spec=None):
+        """ A schedule of one pattern of the arena ``spec``, by default the built-in patterns. """
+        if the_pattern is None:
+            the_pattern = 'a'
+        if spec is None:
+            from envspec import EnvSpec
+            spec = EnvSpec()
+        return ObstacleSchedule([spec.pattern(the_pattern)], seed)
+
+    def key(self):
+        """
+        Identifies the lanes the schedule yields. With a single pattern the seed
+        changes nothing, so every seed has the same key.
+        """
+        patterns = tuple(tuple(pattern) for pattern in self.patterns)
+        if len(patterns) == 1:
+            return patterns, None
+        return patterns, self.seed
+
+    def stream(self, lookahead=8):
+        return LaneStream(self, lookahead)
+
+    def precompute(self, count):
+        """ The first ``count`` lanes as a list. """
+        lanes = self.stream()
+        return [next(lanes) for i in range(count)]
+
+
+class LaneStream(object):
+    """
+    Endless iterator over the lanes of a schedule, one lane per obstacle respawn.
+
+    Patterns are drawn lazily and copied into a fixed ring buffer, so a run can go
+    on forever without the stream growing or allocating on every respawn. Up to
+    ``lookahead`` upcoming lanes can be peeked at without consuming them.
+    """
+
+    def __init__(self, schedule, lookahead=8):
+        self.patterns = schedule.patterns
+        self.random = Random(schedule.seed)
+        self.lookahead = lookahead
+        self.size = max(len(pattern) for pattern in self.patterns) + lookahead
+        self.buffer = [0] * self.size
+        self.head = 0
+        self.count = 0
+        # lanes handed out so far
+        self.consumed = 0
+
+    def fill(self, count):
+        # only called with count <= lookahead, so a whole pattern always fits
+        while self.count < count:
+            pattern = self.patterns[self.random.randrange(len(self.patterns))]
+            tail = self.head + self.count
+            for lane in pattern:
+                self.buffer[tail % self.size] = lane
+                tail += 1
+            self.count += len(pattern)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self.fill(1)
+        lane = self.buffer[self.head]
+        self.head = (self.head + 1) % self.size
+        self.count -= 1
+        self.consumed += 1
+        return lane
+
+    def peek_at(self, i):
+        """ The lane that comes after the next ``i`` ones, without consuming anything. """
+        if i >= self.lookahead:
+            raise ValueError("Can only look {0} lanes ahead".format(self.lookahead))
+        self.fill(i + 1)
+        return self.buffer[(self.head + i) % self.size]
+
+    def peek(self, count=1):
+        """ The next ``count`` lanes, without consuming them. """
+        return [self.peek_at(i) for i in range(count)]
@@ -0,0 +1,102 @@
+"""
+Where the time of a generation goes: named timers and counters around the phases
+of the game loop, summed up per generation by a neat reporter.
+
+Nothing is timed unless a Profiler is handed to the game, the loops only check
+``profiler is not None`` once per phase.
+"""
+import json
+import time
+
+import numpy as np
+from neat.reporting import BaseReporter
+
+PERCENTILES = [50, 90, 99]
+
+
+class Profiler(object):
+    """
+    Collects one sample per phase and tick. Timing a phase is
+
+        t = profiler.time()
+        ...
+        t = profiler.record('phase', t)
+
+    record() returns the current time, so phases that follow each other chain
+    without reading the clock twice.
+    """
+
+    def __init__(self):
+        self.samples = {}
+        self.counters = {}
+
+    def time(self):
+        return time.perf_counter()
+
+    def record(self, name, start):
+        now = time.perf_counter()
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = []
+        samples.append(now - start)
+        return now
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self):
+        self.samples = {}
+        self.counters = {}
+
+    def summary(self):
+        """ Per phase the number of samples, the total and the percentiles in milliseconds, and the counters. """
+        phases = {}
+        for name, samples in self.samples.items():
+            milliseconds = np.array(samples) * 1000
+            phase = {'count': len(samples), 'total': float(milliseconds.sum())}
+            for p, value in zip(PERCENTILES, np.percentile(milliseconds, PERCENTILES)):
+                phase['p{0}'.format(p)] = float(value)
+            phases[name] = phase
+        return {'phases': phases, 'counters': dict(self.counters)}
+
+
+class ProfileReporter(BaseReporter):
+    """
+    Resets ``profiler`` at the start of every generation and reports what it
+    collected at the end: printed with ``show``, and appended to ``filename`` as
+    one JSON object per generation.
+    """
+
+    def __init__(self, profiler, show=True, filename=None):
+        self.profiler = profiler
+        self.show = show
+        self.filename = filename
+        self.generation = None
+
+    def start_generation(self, generation):
+        self.generation = generation
+        self.profiler.reset()
+
+    def end_generation(self, config, population, species_set):
+        summary = self.profiler.summary()
+        summary['generation'] = self.generation
+        if self.show:
+            self.print_summary(summary)
+        if self.filename is not None:
+            with open(self.filename, 'a') as f:
+                f.write(json.dumps(summary, sort_keys=True) + '\n')
+
+    @staticmethod
+    def print_summary(summary):
+        phases = summary['phases']
+        if not phases:
+            return
+        columns = ['p{0}'.format(p) for p in PERCENTILES]
+        print('{:>12} {:>8} {:>10} '.format('phase', 'count', 'total ms') +
+              ' '.join('{:>8}'.format(column + ' ms') for column in columns))
+        for name in sorted(phases, key=lambda name: -phases[name]['total']):
+            phase = phases[name]
+            print('{:>12} {:>8} {:>10.1f} '.format(name, phase['count'], phase['total']) +
+                  ' '.join('{:>8.3f}'.format(phase[column]) for column in columns))
+        if summary['counters']:
+            print('    ' + ', '.join('{0} {1}'.format(name, value) for name, value in sorted(summary['counters'].items())))
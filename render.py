@@ -0,0 +1,241 @@
+import time
+
+import pygame
+from pygame.locals import *
+
+from button import Button
+from GameComponent import GameState, PlayerState, SCREEN_WIDTH, SCREEN_HEIGHT, KEY_RESET, KEY_START, KEY_LEFT, \
+    KEY_RIGHT
+
+RED = (255, 0, 0)
+BLUE = (0, 0, 255)
+GREEN = (0, 255, 0)
+BLACK = (0, 0, 0)
+GREY = (50, 50, 50)
+WHITE = (255, 255, 255)
+ORANGE = (255, 180, 0)
+
+# pygame keys to the keys GamePlay.key_down() understands
+KEYS = {
+    K_o: KEY_RESET,
+    K_p: KEY_START,
+    K_LEFT: KEY_LEFT,
+    K_RIGHT: KEY_RIGHT,
+}
+
+display = None
+
+
+class Display(object):
+    """ The window and everything that needs it, created once by get_display(). """
+
+    def __init__(self, size=(SCREEN_WIDTH, SCREEN_HEIGHT)):
+        pygame.init()
+        pygame.display.set_caption("Bouncy Ball")
+        self.open(size)
+        self.clock = pygame.time.Clock()
+        pygame.key.set_repeat(1, 40)
+
+        self.text_font = pygame.font.SysFont('monospace', 30)
+        self.glyphs = {}
+        self.button_style = {"hover_color": GREY,
+                             "clicked_color": WHITE,
+                             "clicked_font_color": BLACK,
+                             "font": self.text_font}
+
+
+    def open(self, size):
+        """ (Re)size the window, a game in a different arena needs a different one. """
+        self.size = size
+        self.screen = pygame.display.set_mode(size, 0, 32)
+        self.background = self.make_background()
+
+    def make_background(self):
+        """ The white grid behind the game, drawn once. """
+        width, height = self.screen.get_size()
+        background = pygame.Surface((width, height)).convert()
+        background.fill((255, 255, 255))
+        for x in range(0, width, 25):
+            pygame.draw.line(background, (200, 200, 200), (x, 0), (x, height), 1)
+        for y in range(0, height, 25):
+            pygame.draw.line(background, (200, 200, 200), (0, y), (width, y), 1)
+        return background
+
+    def glyph(self, char, color, background):
+        key = (char, color, background)
+        glyph = self.glyphs.get(key)
+        if glyph is None:
+            glyph = self.text_font.render(char, True, color, background)
+            self.glyphs[key] = glyph
+        return glyph
+
+    def draw_text(self, surf, text, pos, color, background):
+        """
+        Blit ``text`` one cached glyph at a time instead of rendering the string,
+        the font is monospace. Returns the rect that was drawn.
+        """
+        x, y = pos
+        rect = pygame.Rect(x, y, 0, 0)
+        for char in text:
+            rect.union_ip(surf.blit(self.glyph(char, color, background), (x, y)))
+            x += self.glyphs[(char, color, background)].get_width()
+        return rect
+
+
+class FramePacer(object):
+    """
+    Picks the ticks worth drawing when the game runs faster than it is watched:
+    every ``every``-th tick, and with ``fps`` at most that many frames per second
+    of wall-clock time. The game itself is never slowed down.
+    """
+
+    def __init__(self, every=1, fps=None):
+        self.every = every
+        self.fps = fps
+        self.last = None
+
+    def due(self, tick):
+        if tick % self.every:
+            return False
+        if self.fps is not None:
+            now = time.perf_counter()
+            if self.last is not None and now - self.last < 1.0 / self.fps:
+                return False
+            self.last = now
+        return True
+
+
+def get_display(size=None):
+    """ Opens the window the first time it is needed, ``size`` resizes it. """
+    global display
+    if display is None:
+        display = Display(size or (SCREEN_WIDTH, SCREEN_HEIGHT))
+    elif size is not None and size != display.size:
+        display.open(size)
+    return display
+
+
+def draw_circle(surf, color, pos, radius):
+    return pygame.draw.circle(surf, color, pos, radius)
+
+
+def draw_box(surf, color, pos, dim):
+    r = pygame.Rect((int(pos[0] - dim[0] / 2 + 1), pos[1]), dim)
+    pygame.draw.rect(surf, color, r)
+
+
+def draw_button(surf, color, pos, dim, text):
+    r = pygame.Rect(pos, dim)
+    pygame.draw.rect(surf, color, r)
+
+
+class GameRenderer(object):
+    """
+    Paints a GamePlay onto the screen, it never changes the game state.
+
+    The grid is a background drawn once. Every frame only the rects drawn in the
+    previous frame are restored from it and render() returns the rects that
+    changed, for pygame.display.update(rects).
+    """
+
+    def __init__(self, size=None):
+        self.display = get_display(size)
+        self.screen = self.display.screen
+        self.background = self.display.background
+        self.play_button = None
+        # None => the next frame repaints the whole window, the display is shared
+        # with the renderers of earlier games
+        self.drawn = None
+
+    def menu_button(self, game_play):
+        if self.play_button is None:
+            self.play_button = Button((0, 0, 200, 50), BLACK, game_play.play_button_click,
+                                      text="Play", **self.display.button_style)
+            self.play_button.rect.center = (self.screen.get_rect().centerx, 100)
+        return self.play_button
+
+    def check_event(self, game_play, event):
+        self.menu_button(game_play).check_event(event)
+        if event.type == KEYDOWN and event.key in KEYS:
+            game_play.key_down(KEYS[event.key])
+
+    def draw_player(self, player, position):
+        rect = draw_circle(self.screen, BLACK, position, player.radius)
+        draw_circle(self.screen, player.color, position, player.radius_without_border)
+        return rect
+
+    def draw_obstacle(self, obstacle, position):
+        return draw_circle(self.screen, obstacle.color, position, obstacle.radius)
+
+    @staticmethod
+    def faded(game_play, player):
+        """ Dead players and their score stay on screen for a second of game time. """
+        return player.state == PlayerState.DEAD and \
+            game_play.current_fps - player.dead_tick > game_play.ticks(1)
+
+    def render(self, game_play, alpha=1.0):
+        """
+        Draw a frame ``alpha`` of the way from the previous tick to the last one,
+        returns the rects of the screen that changed.
+        """
+        # nothing moves outside of PLAYING, the previous positions may be stale
+        if game_play.state != GameState.PLAYING:
+            alpha = 1.0
+        if self.drawn is None:
+            self.screen.blit(self.background, (0, 0))
+            dirty = [self.screen.get_rect()]
+        else:
+            for rect in self.drawn:
+                self.screen.blit(self.background, rect, rect)
+            dirty = self.drawn
+        drawn = []
+
+        if game_play.state in [GameState.PLAYING, GameState.WAITING, GameState.ALL_DEAD]:
+            # closest_obstacles() works on the positions of the last tick
+            obstacle_positions = dict((obstacle.position, obstacle.interpolated_position(alpha))
+                                      for obstacle in game_play.obstacles)
+            for player in game_play.players:
+                if self.faded(game_play, player):
+                    continue
+                position = player.interpolated_position(alpha)
+                if game_play.draw_line:
+                    obstacles = game_play.closest_obstacles(player)
+                    for obstacle in obstacles:
+                        if obstacle[1] > 1000:
+                            continue
+                        end = obstacle_positions.get(obstacle[0], obstacle[0])
+                        drawn.append(pygame.draw.line(self.screen, RED, position, end, 1))
+                drawn.append(self.draw_player(player, position))
+            for obstacle in game_play.obstacles:
+                drawn.append(self.draw_obstacle(obstacle, obstacle.interpolated_position(alpha)))
+
+        if game_play.state in [GameState.MENU
+                               # ,GameState.ALL_DEAD
+                               ]:
+            button = self.menu_button(game_play)
+            button.update(self.screen)
+            drawn.append(button.rect.copy())
+
+        for player in game_play.dead_players:
+            if self.faded(game_play, player):
+                continue
+            position = player.interpolated_position(alpha)
+            drawn.append(self.display.draw_text(self.screen, "{:.1f}".format(player.dead_score),
+                                                (position[0] - player.radius,
+                                                 position[1] - 2.5 * player.radius),
+                                                (255, 255, 255), (0, 25, 0)))
+
+        score_y = 0
+        if game_play.gen is not None:
+            score_y = 35
+        drawn.append(self.display.draw_text(self.screen, "{:.1f}".format(game_play.score), (0, score_y),
+                                            (255, 255, 255), (0, 0, 0)))
+
+        if game_play.gen is not None:
+            drawn.append(self.display.draw_text(self.screen, "Gen: {0}".format(game_play.gen), (0, 0),
+                                                (255, 255, 255), (0, 0, 0)))
+
+        # clipped to the window, rects of things partly off screen stick out of it
+        screen_rect = self.screen.get_rect()
+        self.drawn = [rect.clip(screen_rect) for rect in drawn]
+        return dirty + self.drawn
@@ -0,0 +1,147 @@
+"""
+The packed checkpoint format: genomes and species survive a round trip, delta
+chains restore the population they were saved from, and a restored run evolves
+exactly like the run that saved it.
+
+    python -m pytest tests
+"""
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import neat
+import pytest
+from neat.reporting import BaseReporter
+
+from catalog import CheckpointCatalog
+from checkpoint import (BinaryCheckPointer, load_population, pack_genomes, pack_species, read_checkpoint,
+                        unpack_genomes, unpack_species)
+
+GENERATIONS = 8
+RESUME_FROM = 4
+
+
+def load_config():
+    config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                         neat.DefaultStagnation, os.path.join(ROOT, 'config-feedforward.txt'))
+    config.no_fitness_termination = True
+    return config
+
+
+def evaluate(genomes, config):
+    # depends on the genes only, like a game of one pattern
+    for genome_id, genome in genomes:
+        genome.fitness = sum(conn.weight for conn in genome.connections.values() if conn.enabled) + \
+                         sum(node.bias for node in genome.nodes.values())
+
+
+def genes(genome):
+    """ Everything of a genome, in dict order: neat's mutations depend on it. """
+    return (genome.key, genome.fitness,
+            [(key, node.bias, node.response, node.activation, node.aggregation) for key, node in genome.nodes.items()],
+            [(key, conn.weight, conn.enabled) for key, conn in genome.connections.items()])
+
+
+def species(species_set):
+    return [(key, s.created, s.last_improved, s.fitness, s.adjusted_fitness, s.fitness_history,
+             s.representative.key, list(s.members)) for key, s in species_set.species.items()]
+
+
+class Snapshots(BaseReporter):
+    """ The population and species at the end of every generation. """
+
+    def __init__(self):
+        self.generation = None
+        self.snapshots = {}
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def end_generation(self, config, population, species_set):
+        self.snapshots[self.generation] = (sorted(genes(genome) for genome in population.values()),
+                                           species(species_set))
+
+
+def run(population, generations, prefix):
+    snapshots = Snapshots()
+    population.add_reporter(snapshots)
+    population.add_reporter(BinaryCheckPointer(1, None, prefix, base_interval=3, background=False))
+    population.run(evaluate, generations)
+    return snapshots.snapshots
+
+
+@pytest.fixture
+def config():
+    return load_config()
+
+
+@pytest.fixture
+def saved_run(config, tmp_path):
+    """ A run checkpointed every generation, with a full checkpoint every third one. """
+    random.seed(3)
+    prefix = str(tmp_path / 'neat-checkpoint-')
+    population = neat.Population(config)
+    snapshots = run(population, GENERATIONS, prefix)
+    return population, snapshots, prefix
+
+
+def test_genomes_round_trip(config, saved_run):
+    population, snapshots, prefix = saved_run
+    genomes = list(population.population.values())
+    unpacked = unpack_genomes(pack_genomes(genomes), config)
+    for genome in unpacked:
+        genome.fitness = population.population[genome.key].fitness
+    assert [genes(genome) for genome in unpacked] == [genes(genome) for genome in genomes]
+
+    indices = [3, 0, len(genomes) - 1]
+    some = unpack_genomes(pack_genomes(genomes), config, indices)
+    assert [genome.key for genome in some] == [genomes[i].key for i in indices]
+
+
+def test_species_round_trip(config, saved_run):
+    population, snapshots, prefix = saved_run
+    species_set = unpack_species(pack_species(population.species), config, population.population)
+    assert species(species_set) == species(population.species)
+    assert species_set.genome_to_species == population.species.genome_to_species
+
+
+def test_delta_chain_restores_every_generation(config, saved_run):
+    population, snapshots, prefix = saved_run
+    deltas = 0
+    for generation in range(GENERATIONS):
+        filename = '{0}{1}.pack'.format(prefix, generation)
+        if read_checkpoint(filename, ['population'])['population']['previous'] is not None:
+            deltas += 1
+        saved_generation, restored = load_population(filename, config)
+        assert saved_generation == generation
+        assert sorted(genes(genome) for genome in restored.values()) == snapshots[generation][0]
+    assert deltas > 0
+
+
+def test_restored_run_evolves_identically(config, saved_run, tmp_path):
+    population, snapshots, prefix = saved_run
+    restored = BinaryCheckPointer.restore_checkpoint('{0}{1}.pack'.format(prefix, RESUME_FROM), config)
+    assert restored.generation == RESUME_FROM + 1
+
+    resumed = run(restored, GENERATIONS - RESUME_FROM - 1, str(tmp_path / 'resumed-'))
+    assert sorted(resumed) == list(range(RESUME_FROM + 1, GENERATIONS))
+    for generation, snapshot in resumed.items():
+        assert snapshot == snapshots[generation]
+
+
+def test_catalog_loads_from_deltas(config, saved_run, tmp_path):
+    population, snapshots, prefix = saved_run
+    catalog = CheckpointCatalog(str(tmp_path))
+    name = 'neat-checkpoint-{0}.pack'.format(GENERATIONS - 1)
+    assert catalog.latest() == name
+
+    keys = list(population.population)
+    genomes = catalog.load_genomes(name, keys, config)
+    assert sorted(genes(genome) for genome in genomes.values()) == snapshots[GENERATIONS - 1][0]
+
+    species_key = next(iter(population.species.species))
+    members = catalog.load_species(name, species_key, config)
+    assert sorted(members) == sorted(population.species.species[species_key].members)
@@ -0,0 +1,79 @@
+"""
+The batched PopulationNetwork and the exported CompiledNetwork give exactly the
+outputs of neat's FeedForwardNetwork, compared with ``==``: training decides with
+the first, replay with the second, and a decision right at its threshold must
+not go one way in training and the other in replay.
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import neat
+import numpy as np
+import pytest
+
+from artifact import export_winner, load_winner
+from inference import PopulationNetwork
+
+CHECKPOINTS = ['pattern-a/neat-checkpoint-9', 'pattern-c/neat-checkpoint-104', 'pattern-c/neat-checkpoint-439']
+GENOMES_PER_CHECKPOINT = 40
+ROUNDS = 50
+
+
+@pytest.fixture(scope='module')
+def config():
+    return neat.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                       neat.DefaultStagnation, os.path.join(ROOT, 'config-feedforward.txt'))
+
+
+@pytest.fixture(scope='module')
+def genomes():
+    """ Trained genomes, with hidden nodes and disabled connections. """
+    genomes = []
+    for checkpoint in CHECKPOINTS:
+        population = neat.Checkpointer.restore_checkpoint(os.path.join(ROOT, checkpoint))
+        genomes += list(population.population.values())[:GENOMES_PER_CHECKPOINT]
+    return genomes
+
+
+def random_inputs(rounds, count, num_inputs, seed=0):
+    # around the range of the game's sensors, and near 0 where tanh is steepest
+    rnd = np.random.RandomState(seed)
+    for i in range(rounds):
+        scale = 300.0 if i % 2 == 0 else 0.01
+        yield rnd.uniform(-scale, scale, size=(count, num_inputs))
+
+
+def test_population_network_is_exact(genomes, config):
+    networks = PopulationNetwork(genomes, config)
+    references = [neat.nn.FeedForwardNetwork.create(genome, config) for genome in genomes]
+    rows = np.arange(len(genomes))
+    for inputs in random_inputs(ROUNDS, len(genomes), networks.num_inputs):
+        outputs = networks.activate(rows, inputs).tolist()
+        expected = [net.activate(row) for net, row in zip(references, inputs.tolist())]
+        assert outputs == expected
+
+
+def test_population_network_rows(genomes, config):
+    # any subset of rows, in any order, like the players still alive
+    networks = PopulationNetwork(genomes, config)
+    rows = np.arange(len(genomes))[::-3]
+    inputs = next(random_inputs(1, len(rows), networks.num_inputs, seed=1))
+    expected = [neat.nn.FeedForwardNetwork.create(genomes[row], config).activate(values)
+                for row, values in zip(rows, inputs.tolist())]
+    assert networks.activate(rows, inputs).tolist() == expected
+
+
+def test_compiled_network_is_exact(genomes, config, tmp_path):
+    filename = str(tmp_path / 'winner.npz')
+    for genome in genomes[::8]:
+        export_winner(genome, config, filename)
+        compiled = load_winner(filename)
+        reference = neat.nn.FeedForwardNetwork.create(genome, config)
+        for inputs in random_inputs(4, 10, compiled.num_inputs):
+            for row in inputs.tolist():
+                assert compiled.activate(row) == reference.activate(row)
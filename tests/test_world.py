@@ -0,0 +1,88 @@
+"""
+The two paths of World.nearest_obstacles(), the lane index and looking at every
+obstacle, pick the same rows with the same offsets, ties included.
+
+    python -m pytest tests
+"""
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pytest
+
+import world
+from world import World
+
+ARENAS = 300
+LANES = [0, 75, 150, 225, 300]
+RADIUS = 25
+# enough obstacles for the lane index to be worth it
+MIN_OBSTACLES = world.INDEX_MIN_OBSTACLES
+
+
+def both_paths(monkeypatch, w, positions):
+    """ (rows, offsets) of the brute-force path and of the lane index path. """
+    monkeypatch.setattr(world, 'INDEX_MIN_OBSTACLES', 10 ** 9)
+    brute = w.nearest_obstacles(positions)
+    monkeypatch.setattr(world, 'INDEX_MIN_OBSTACLES', 0)
+    indexed = w.nearest_obstacles(positions)
+    return brute, indexed
+
+
+def assert_same(brute, indexed):
+    assert (brute[0] == indexed[0]).all()
+    assert (brute[1] == indexed[1]).all()
+
+
+def random_arena(rnd, height=600, step=6):
+    w = World(300, height, 1.5, step)
+    count = rnd.randrange(MIN_OBSTACLES, 60)
+    for i in range(count):
+        w.add_obstacle(RADIUS)
+    for i in range(count):
+        w.place_obstacle(i, (rnd.choice(LANES), rnd.randrange(-1000, 1700)))
+    return w
+
+
+def random_positions(rnd, w, count=200, top=None):
+    """ Player positions, only in the ``top`` rows of the arena if given. """
+    height = w.height if top is None else top
+    positions = np.array([(rnd.randrange(300), rnd.randrange(height)) for i in range(count)], dtype=float)
+    # players right on an obstacle, where every tie is at distance 0
+    positions[:20] = w.obstacle_positions[rnd.randrange(w.obstacle_count)]
+    return positions
+
+
+@pytest.mark.parametrize('stack', [3, None])
+def test_stacked_obstacles(monkeypatch, stack):
+    """ Obstacles moved onto the same spots, at most ``stack`` on one spot. """
+    for arena in range(ARENAS):
+        rnd = random.Random(arena)
+        w = random_arena(rnd)
+        n = w.obstacle_count
+        spots = [(rnd.choice(LANES), rnd.randrange(-100, 700)) for i in range(n // 2)]
+        for k in range(3 * n):
+            spot = rnd.choice(spots)
+            if stack is not None and (w.obstacle_positions == spot).all(axis=1).sum() >= stack:
+                spot = (rnd.choice(LANES), rnd.randrange(-100, 700))
+            w.place_obstacle(rnd.randrange(n), spot)
+        assert_same(*both_paths(monkeypatch, w, random_positions(rnd, w)))
+
+
+@pytest.mark.parametrize('height, step', [(600, 6), (650, 6.5), (600, 6.25)])
+def test_falling_obstacles(monkeypatch, height, step):
+    """
+    Ticks with whole and fractional steps. A fractional step truncates y = -7 and
+    y = -6 both to 0, obstacles come level at the top and out of row order.
+    """
+    for arena in range(ARENAS // 10):
+        rnd = random.Random(arena)
+        w = random_arena(rnd, height, step)
+        for tick in range(100):
+            for index in w.update_obstacles():
+                w.place_obstacle(index, (rnd.choice(LANES), -RADIUS - rnd.randrange(10)))
+            assert_same(*both_paths(monkeypatch, w, random_positions(rnd, w, 50, top=100)))
@@ -1,11 +1,19 @@
-import math
 """Uses `pickle` to save and restore populations (and other aspects of the simulation state)."""
 from __future__ import print_function
 
+import atexit
 import gzip
+import math
+import os
 import random
+import threading
 import time
 
+try:
+    import queue
+except ImportError:
+    import Queue as queue  # pylint: disable=import-error
+
 try:
     import cPickle as pickle  # pylint: disable=import-error
 except ImportError:
@@ -15,6 +23,71 @@ from neat.population import Population
 from neat.reporting import BaseReporter
 
 
+def write_atomic(filename, write):
+    """
+    Calls ``write(f)`` on a temporary file next to ``filename``, syncs it to disk and
+    only then renames it to ``filename``. A crash leaves the old file or none, never
+    half of one.
+    """
+    temporary = filename + '.tmp'
+    with open(temporary, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, filename)
+
+
+class BackgroundWriter(object):
+    """
+    Writes files with write_atomic() on a background thread.
+
+    At most ``max_pending`` writes wait in the queue, write() blocks when it is full
+    so a slow disk cannot pile up snapshots in memory. Everything queued is written
+    before the interpreter exits. An error in the thread is raised again by the next
+    write(), flush() or close().
+    """
+
+    def __init__(self, max_pending=2):
+        self.queue = queue.Queue(max_pending)
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name='checkpoint-writer')
+        self.thread.daemon = True
+        self.thread.start()
+        atexit.register(self.close)
+
+    def write(self, filename, write):
+        self.check()
+        self.queue.put((filename, write))
+
+    def run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                if job is None:
+                    return
+                write_atomic(*job)
+            except Exception as e:  # pylint: disable=broad-except
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def check(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def flush(self):
+        """ Wait until everything queued is on disk. """
+        self.queue.join()
+        self.check()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self.check()
+
+
 class CheckPointer(BaseReporter):
     """
     A reporter class that performs checkpointing using `pickle`
@@ -22,16 +95,20 @@ class CheckPointer(BaseReporter):
     """
 
     def __init__(self, generation_interval=100, time_interval_seconds=300,
-                 filename_prefix='neat-checkpoint-'):
+                 filename_prefix='neat-checkpoint-', background=True):
         """
         Saves the current state (at the end of a generation) every ``generation_interval`` generations or
         ``time_interval_seconds``, whichever happens first.
 
+        The state is snapshotted in ``end_generation``, compressing and writing it happens on a
+        background thread unless ``background`` is False.
+
         :param generation_interval: If not None, maximum number of generations between save intervals
         :type generation_interval: int or None
         :param time_interval_seconds: If not None, maximum number of seconds between checkpoint attempts
         :type time_interval_seconds: float or None
         :param str filename_prefix: Prefix for the filename (the end will be the generation number)
+        :param bool background: Write checkpoints on a background thread
         """
         self.generation_interval = generation_interval
         self.time_interval_seconds = time_interval_seconds
@@ -41,6 +118,10 @@ class CheckPointer(BaseReporter):
         self.last_generation_checkpoint = -1
         self.last_time_checkpoint = time.time()
 
+        self.writer = None
+        if background:
+            self.writer = BackgroundWriter()
+
     def start_generation(self, generation):
         self.current_generation = generation
 
@@ -67,10 +148,26 @@ class CheckPointer(BaseReporter):
         filename = '{0}{1}'.format(self.filename_prefix, generation)
         print("Saving checkpoint to {0}".format(filename))
 
-        with gzip.open(filename, 'w', compresslevel=5) as f:
-            data = (generation, config, population, species_set, random.getstate())
-            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # pickling is the snapshot, the population changes as soon as we return
+        data = pickle.dumps((generation, config, population, species_set, random.getstate()),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+
+        def write(f):
+            with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=5) as compressed:
+                compressed.write(data)
+
+        self.write(filename, write)
+
+    def write(self, filename, write):
+        if self.writer is None:
+            write_atomic(filename, write)
+        else:
+            self.writer.write(filename, write)
 
+    def flush(self):
+        """ Wait until every checkpoint is on disk. """
+        if self.writer is not None:
+            self.writer.flush()
 
     @staticmethod
     def restore_checkpoint(filename):
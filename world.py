@@ -0,0 +1,341 @@
+import numpy as np
+
+# same values as GameComponent.PlayerState
+ALIVE = 1
+DEAD = 2
+
+# below this many obstacles comparing every player with every obstacle is cheaper
+# than looking them up in the lane index
+INDEX_MIN_OBSTACLES = 24
+
+
+class LaneIndex(object):
+    """
+    Obstacle rows sorted by lane, their x, then by y and row within the lane.
+
+    Obstacles spawn at a few discrete x lanes and all fall by the same whole number
+    of pixels, so a tick never changes the order: only an obstacle that is placed
+    somewhere else moves in the index, with remove() and insert(). Other ticks
+    rebuild it, see World.update_obstacles(). Queries find the obstacles of
+    a lane around a y with a binary search instead of looking at all of them.
+    """
+
+    def __init__(self):
+        self.order = np.zeros(0, dtype=np.intp)
+        # x of every lane, the lane's rows are order[starts[i]:starts[i + 1]]
+        self.lanes = np.zeros(0)
+        self.starts = np.zeros(1, dtype=np.intp)
+
+    def remove(self, index):
+        self.order = self.order[self.order != index]
+
+    def insert(self, positions, index):
+        x, y = positions[index]
+        xs = positions[self.order, 0]
+        lo = np.searchsorted(xs, x, 'left')
+        hi = np.searchsorted(xs, x, 'right')
+        ys = positions[self.order[lo:hi], 1]
+        # among obstacles at the same y the lower row goes first
+        first = lo + np.searchsorted(ys, y, 'left')
+        last = lo + np.searchsorted(ys, y, 'right')
+        at = first + np.searchsorted(self.order[first:last], index)
+        self.order = np.insert(self.order, at, index)
+        self.split(positions)
+
+    def rebuild(self, positions, count):
+        # lexsort is stable, rows at the same spot stay in row order
+        self.order = np.lexsort((positions[:count, 1], positions[:count, 0])).astype(np.intp)
+        self.split(positions)
+
+    def split(self, positions):
+        xs = positions[self.order, 0]
+        bounds = np.flatnonzero(xs[1:] != xs[:-1]) + 1
+        self.lanes = xs[np.r_[0, bounds]] if len(xs) else np.zeros(0)
+        self.starts = np.r_[0, bounds, len(xs)].astype(np.intp)
+
+    def lane(self, i):
+        return self.order[self.starts[i]:self.starts[i + 1]]
+
+
+class World(object):
+    """
+    Structure-of-arrays state of a game: one row per player and per obstacle.
+
+    Player and Obstacle objects only keep their row index, every tick the whole
+    population is moved with a few array operations instead of a Python loop.
+    """
+
+    def __init__(self, width, height, gravity, obstacle_speed, capacity=64):
+        self.width = width
+        self.height = height
+        self.gravity = gravity
+        self.obstacle_speed = obstacle_speed
+
+        self.player_count = 0
+        self.positions = np.zeros((capacity, 2))
+        # where things were before the last tick, only kept when the game is drawn
+        self.previous_positions = np.zeros((capacity, 2))
+        self.velocities = np.zeros((capacity, 2))
+        self.radii = np.zeros(capacity)
+        self.states = np.full(capacity, ALIVE, dtype=np.int8)
+        self.last_jumps = np.zeros(capacity, dtype=np.int64)
+        self.dead_scores = np.zeros(capacity)
+
+        self.obstacle_count = 0
+        self.obstacle_positions = np.zeros((0, 2))
+        self.previous_obstacle_positions = np.zeros((0, 2))
+        self.obstacle_velocities = np.zeros((0, 2))
+        self.obstacle_radii = np.zeros(0)
+        self.lane_index = LaneIndex()
+        # a tick keeps the lane index sorted only when every obstacle falls alike by
+        # whole pixels, a fractional step truncates different ys to the same one
+        self.ordered_ticks = float(obstacle_speed).is_integer()
+
+    def add_player(self, radius):
+        """ Reserve a row for a new player and return its index. """
+        if self.player_count == len(self.radii):
+            self.grow(2 * len(self.radii))
+        index = self.player_count
+        self.player_count += 1
+        self.positions[index] = (0, 0)
+        self.previous_positions[index] = (0, 0)
+        self.velocities[index] = (0, 0)
+        self.radii[index] = radius
+        self.states[index] = ALIVE
+        self.last_jumps[index] = -7
+        self.dead_scores[index] = 0
+        return index
+
+    def grow(self, capacity):
+        n = self.player_count
+        for name in ['positions', 'previous_positions', 'velocities', 'radii', 'states', 'last_jumps', 'dead_scores']:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:n] = old[:n]
+            setattr(self, name, new)
+
+    def add_obstacle(self, radius):
+        """ Reserve a row for a new obstacle and return its index. """
+        index = self.obstacle_count
+        self.obstacle_count += 1
+        self.obstacle_positions = np.append(self.obstacle_positions, [(0, 0)], axis=0)
+        self.previous_obstacle_positions = np.append(self.previous_obstacle_positions, [(0, 0)], axis=0)
+        self.obstacle_velocities = np.append(self.obstacle_velocities, [(0, self.obstacle_speed)], axis=0)
+        self.obstacle_radii = np.append(self.obstacle_radii, radius)
+        self.lane_index.insert(self.obstacle_positions, index)
+        return index
+
+    def place_obstacle(self, index, position):
+        """ Move an obstacle somewhere else, its lane or its place in the lane may change. """
+        self.lane_index.remove(index)
+        self.obstacle_positions[index] = position
+        self.lane_index.insert(self.obstacle_positions, index)
+
+    def set_obstacle_velocity(self, index, velocity):
+        self.obstacle_velocities[index] = velocity
+        velocities = self.obstacle_velocities
+        self.ordered_ticks = bool((velocities == velocities[0]).all() and (velocities == np.trunc(velocities)).all())
+        if not self.ordered_ticks:
+            self.lane_index.rebuild(self.obstacle_positions, self.obstacle_count)
+
+    def save_previous(self):
+        """ Remember where everything is before a tick, frames are drawn in between. """
+        n = self.player_count
+        self.previous_positions[:n] = self.positions[:n]
+        self.previous_obstacle_positions[:] = self.obstacle_positions
+
+    @staticmethod
+    def interpolate(previous, positions, index, alpha):
+        """ Whole-pixel position of row ``index``, ``alpha`` of the way from ``previous``. """
+        x, y = positions.item(index, 0), positions.item(index, 1)
+        if alpha < 1.0:
+            x0, y0 = previous.item(index, 0), previous.item(index, 1)
+            x = x0 + (x - x0) * alpha
+            y = y0 + (y - y0) * alpha
+        return int(x), int(y)
+
+    def kill(self, indices, score):
+        self.states[indices] = DEAD
+        self.dead_scores[indices] = score
+
+    def update_players(self):
+        """
+        Apply gravity, move every player and bounce the ones touching a side wall.
+        Dead players just fall with the obstacles.
+
+        Returns the indices of the alive players that left the screen, the caller
+        decides what dying means.
+        """
+        n = self.player_count
+        positions = self.positions[:n]
+        velocities = self.velocities[:n]
+        radii = self.radii[:n]
+        alive = self.states[:n] == ALIVE
+
+        velocities[~alive] = (0, self.obstacle_speed)
+        velocities[alive, 1] += self.gravity
+        # positions are whole pixels, like Component.set_position
+        np.trunc(positions + velocities, out=positions)
+
+        x = positions[:, 0]
+        y = positions[:, 1]
+        out = alive & ((y + radii >= self.height) | (y - radii < 0))
+        inside = alive & ~out
+        left = inside & (x - radii < 0)
+        right = inside & ~left & (x + radii > self.width)
+        x[left] = np.trunc(radii[left])
+        x[right] = np.trunc(self.width - radii[right])
+        velocities[left | right, 0] *= -1
+
+        return np.flatnonzero(out)
+
+    def update_obstacles(self):
+        """ Move every obstacle, returns the indices of the ones below the screen. """
+        positions = self.obstacle_positions
+        np.trunc(positions + self.obstacle_velocities, out=positions)
+        if not self.ordered_ticks:
+            self.lane_index.rebuild(positions, self.obstacle_count)
+        return np.flatnonzero(positions[:, 1] - self.obstacle_radii > self.height)
+
+    def collide(self):
+        """
+        Alive players touching any obstacle, same rule as Obstacle.touch():
+        distance < player radius + obstacle radius - 0.1.
+
+        All squared distances are computed at once by broadcasting players against
+        obstacles. Positions are whole pixels, so comparing squared distances with
+        squared limits gives the same answer as the square root in distance().
+        With many obstacles only the pairs the lane index finds close enough are
+        compared.
+        """
+        n = self.player_count
+        alive = np.flatnonzero(self.states[:n] == ALIVE)
+        if self.obstacle_count >= INDEX_MIN_OBSTACLES:
+            return alive[self.touching(alive)]
+        delta = self.positions[alive, np.newaxis, :] - self.obstacle_positions[np.newaxis, :, :]
+        squared = np.einsum('ijk,ijk->ij', delta, delta)
+        limit = self.radii[alive, np.newaxis] + self.obstacle_radii[np.newaxis, :] - 0.1
+        touched = (squared < limit * limit).any(axis=1)
+        return alive[touched]
+
+    def touching(self, rows):
+        """ Mask of the players at ``rows`` touching an obstacle, looked up lane by lane. """
+        positions = self.positions[rows]
+        radii = self.radii[rows]
+        # nothing further than this from a player along either axis can touch it
+        reach = radii + self.obstacle_radii.max() - 0.1
+        touched = np.zeros(len(rows), dtype=bool)
+        index = self.lane_index
+        for i, x in enumerate(index.lanes):
+            near = np.flatnonzero(np.abs(positions[:, 0] - x) < reach)
+            if not len(near):
+                continue
+            lane = index.lane(i)
+            ys = self.obstacle_positions[lane, 1]
+            lo = np.searchsorted(ys, positions[near, 1] - reach[near], 'right')
+            counts = np.searchsorted(ys, positions[near, 1] + reach[near], 'left') - lo
+            total = counts.sum()
+            if not total:
+                continue
+            # one (player, obstacle) pair per obstacle of the lane in the player's reach
+            players = np.repeat(near, counts)
+            candidates = lane[np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(total)]
+            delta = positions[players] - self.obstacle_positions[candidates]
+            squared = np.einsum('ij,ij->i', delta, delta)
+            limit = radii[players] + self.obstacle_radii[candidates] - 0.1
+            touched[players[squared < limit * limit]] = True
+        return touched
+
+    def nearest_obstacles(self, positions, count=3):
+        """
+        Rows of the ``count`` obstacles closest to each of ``positions``, nearest
+        first and ties in obstacle order, like the stable sort of
+        GamePlay.closest_obstacles(). Returns them with the offsets from the
+        positions to the obstacles.
+
+        With many obstacles only the ``count`` obstacles above and below the
+        player in every lane are candidates, all of a lane has the same x so the
+        closest ones are among them. Both paths pick the same rows.
+        """
+        obstacles = self.obstacle_positions
+        if self.obstacle_count < max(INDEX_MIN_OBSTACLES, count + 1):
+            candidates = np.broadcast_to(np.arange(self.obstacle_count), (len(positions), self.obstacle_count))
+            offsets = obstacles[np.newaxis, :, :] - positions[:, np.newaxis, :]
+            squared = np.einsum('ijk,ijk->ij', offsets, offsets)
+            if self.obstacle_count > count:
+                # top-k: everything closer than the k-th distance, then the ties at the k-th
+                # distance in obstacle order, like the stable sort this replaces
+                kth = np.partition(squared, count - 1, axis=1)[:, count - 1:count]
+                closer = squared < kth
+                tied = squared == kth
+                tied &= np.cumsum(tied, axis=1) <= count - closer.sum(axis=1, keepdims=True)
+                picked = np.nonzero(closer | tied)[1].reshape(len(squared), count)
+            else:
+                picked = candidates
+            order = np.argsort(np.take_along_axis(squared, picked, axis=1), axis=1, kind='stable')
+            picked = np.take_along_axis(picked, order, axis=1)
+            nearest = np.take_along_axis(candidates, picked, axis=1)
+            offsets = np.take_along_axis(offsets, picked[:, :, np.newaxis], axis=1)
+        else:
+            candidates, squared = self.lane_candidates(positions, count)
+            # positions are whole pixels, so are the squared distances: ties go to the
+            # lower row by sorting on distance and row in one key
+            key = squared * (self.obstacle_count + 1) + candidates
+            picked = np.argpartition(key, count - 1, axis=1)[:, :count]
+            order = np.argsort(np.take_along_axis(key, picked, axis=1), axis=1)
+            nearest = np.take_along_axis(candidates, np.take_along_axis(picked, order, axis=1), axis=1)
+            offsets = obstacles[nearest] - positions[:, np.newaxis, :]
+        return nearest, offsets
+
+    def lane_candidates(self, positions, count):
+        """
+        Per position the rows of the ``count`` obstacles on either side in every
+        lane and their squared distances, infinite where a lane has fewer. Of
+        obstacles at the same spot the lowest rows are taken.
+        """
+        index = self.lane_index
+        window = np.arange(-count, count)
+        below = np.arange(count)
+        rows = []
+        squared = []
+        for i, x in enumerate(index.lanes):
+            lane = index.lane(i)
+            ys = self.obstacle_positions[lane, 1]
+            j = np.searchsorted(ys, positions[:, 1])[:, np.newaxis] + window
+            # where the window below cuts through obstacles at the same y it has to
+            # take the lowest rows of them, which come first in the lane
+            far = j[:, 0]
+            cut = np.flatnonzero(far > 0)
+            cut = cut[ys[far[cut] - 1] == ys[far[cut]]]
+            if len(cut):
+                y = ys[far[cut]]
+                start = np.searchsorted(ys, y, 'left')[:, np.newaxis]
+                end = np.searchsorted(ys, y, 'right')[:, np.newaxis]
+                taken = end - far[cut, np.newaxis]
+                j[cut, :count] = np.where(below < taken, start + below, end + below - taken)
+            inside = (j >= 0) & (j < len(lane))
+            np.clip(j, 0, len(lane) - 1, out=j)
+            # every obstacle of a lane has the lane's x
+            dx = x - positions[:, 0:1]
+            dy = ys[j] - positions[:, 1:2]
+            rows.append(lane[j])
+            squared.append(np.where(inside, dx * dx + dy * dy, np.inf))
+        return np.hstack(rows), np.hstack(squared)
+
+    def sensors(self, indices, count=3):
+        """
+        Network inputs of the players at ``indices``, one row per player: position,
+        distance to the right and bottom borders, then the offsets to the ``count``
+        closest obstacles, nearest first, like GamePlay.closest_obstacles().
+        """
+        positions = self.positions[indices]
+        nearest, offsets = self.nearest_obstacles(positions, count)
+
+        inputs = np.empty((len(positions), 4 + 2 * count))
+        inputs[:, 0:2] = positions
+        inputs[:, 2] = self.width - positions[:, 0]
+        inputs[:, 3] = self.height - positions[:, 1]
+        # missing obstacles are far above the right border
+        inputs[:, 4:] = np.repeat([[self.width, -99999]], count, axis=0).ravel() - np.tile(positions, count)
+        inputs[:, 4:4 + 2 * offsets.shape[1]] = offsets.reshape(len(positions), 2 * offsets.shape[1])
+        return inputs